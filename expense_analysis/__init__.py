@@ -0,0 +1,14 @@
+"""
+Shared helpers for the expense analysis scripts in /scripts/ and /exploration/.
+The loader (pandas, duckdb, pyarrow) is imported on first use, so the CLI
+and lightweight modules start without it.
+"""
+
+__all__ = ["DATA_PATH", "load_expenses", "source_fingerprint"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        from expense_analysis import loader
+        return getattr(loader, name)
+    raise AttributeError(f"module 'expense_analysis' has no attribute {name!r}")
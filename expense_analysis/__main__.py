@@ -0,0 +1,9 @@
+"""
+python -m expense_analysis <command> [args] — see cli.py.
+"""
+
+import sys
+
+from expense_analysis.cli import main
+
+sys.exit(main())
@@ -0,0 +1,151 @@
+# ============================================================
+# 📉 baselines.py
+# ------------------------------------------------------------
+"""
+Rolling per-employee spend baselines.
+The segment z-scores compare an employee with their peers' all-time totals;
+these scores compare each transaction with the same employee's own history
+in the same category: the mean and spread of their purchases over the
+trailing 30 and 90 days, and an exponentially weighted (EWMA) mean and
+spread over everything before it. Only earlier days count as history, so a
+sudden jump is scored against what came before it.
+
+The transactions are fetched once, sorted by employee, category and day.
+Every baseline is then a difference of per-pair running sums, with window
+starts found by binary search, so the cost does not grow with the number of
+employees and no Python loop runs per employee.
+
+Usage (from the project folder):
+    python -m expense_analysis.baselines [--stream | --warehouse | --partitioned] [--cache] [--department=Sales]
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from expense_analysis.loader import connect_expenses, connect_options
+
+WINDOWS = [30, 90]          # trailing windows, in days
+HALF_LIFE_DAYS = 30         # a purchase this many days old counts half in the EWMA
+MIN_HISTORY = 3             # fewer earlier purchases than this: no score
+MIN_STD = 0.01              # spread below a cent counts as none (no score)
+Z_THRESHOLD = 3.0
+
+# -----------------------------
+# 🧮 Helpers: Running Sums
+# -----------------------------
+
+def _run_starts(is_start):
+    """Index of the first row of each row's run, given a run-start mask."""
+    return np.maximum.accumulate(np.where(is_start, np.arange(len(is_start)), 0))
+
+
+def _moments(sums, amount_mean):
+    """(count, mean, std) from count / sum / sum-of-squares of centered amounts."""
+    count, total, squares = sums
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        std = np.sqrt(np.clip(squares / count - mean * mean, 0, None))
+    return count, mean + amount_mean, std
+
+
+def _zscore(amount, mean, std, count, min_history):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where((count >= min_history) & (std >= MIN_STD), (amount - mean) / std, np.nan)
+
+# -----------------------------
+# 📈 Function: Transaction Baselines
+# -----------------------------
+
+def transaction_baselines(con, windows=WINDOWS, half_life_days=HALF_LIFE_DAYS, min_history=MIN_HISTORY):
+    """
+    One row per transaction with its employee × category baselines from
+    earlier days: n_history, then n_/mean_/std_/z_ for each trailing window
+    (e.g. z_30d) and ewma / ewm_std / z_ewma. A z-score is NaN until the
+    baseline holds `min_history` purchases.
+    """
+    tx = con.execute("""
+        SELECT
+            id, CAST(date AS DATE) AS date, department,
+            COALESCE(employee, 'Unknown') AS employee, COALESCE(category, 'Unknown') AS category, vendor,
+            CAST(amount AS DOUBLE) AS amount
+        FROM expenses
+        WHERE amount IS NOT NULL AND date IS NOT NULL
+        ORDER BY employee, category, date, id
+    """).df()
+    employee, category = tx["employee"].to_numpy(), tx["category"].to_numpy()
+    day = tx["date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    amount = tx["amount"].to_numpy()
+
+    new_pair = np.ones(len(tx), dtype=bool)
+    new_pair[1:] = (employee[1:] != employee[:-1]) | (category[1:] != category[:-1])
+    new_day = new_pair.copy()
+    new_day[1:] |= day[1:] != day[:-1]
+    pair = np.cumsum(new_pair) - 1
+    pair_start = _run_starts(new_pair)       # first row of the employee × category pair
+    day_start = _run_starts(new_day)         # first row of the pair's day: history ends before it
+
+    # Amounts are centered on their pair's mean so running sums stay small and
+    # window differences keep their precision
+    pair_mean = (np.bincount(pair, amount) / np.bincount(pair))[pair]
+    centered = amount - pair_mean
+    # EWMA weights 2^((t_i - t) / half_life) factor into 2^(t_i / half_life) /
+    # 2^(t / half_life); t counts from the pair's first day, so the weights
+    # stay finite for ~1,000 half-lives
+    weight = np.exp2((day - day[pair_start]) / float(half_life_days))
+    running = pd.DataFrame({
+        "n": np.ones(len(tx)), "s": centered, "q": centered * centered,
+        "wn": weight, "ws": weight * centered, "wq": weight * centered * centered,
+    }).groupby(pair, sort=False).cumsum().to_numpy()
+
+    def before(rows, columns):
+        """Running sums of the pair's rows before `rows` (zero at the pair's first row)."""
+        return np.where((rows > pair_start)[:, None], running[np.maximum(rows - 1, 0)][:, columns], 0.0)
+
+    history = before(day_start, [0, 1, 2, 3, 4, 5])
+    baselines = tx.assign(n_history=history[:, 0].astype(np.int64))
+
+    # Window of N days before day t: rows from day t - N, found by binary search on (pair, day)
+    key = pair.astype(np.int64) << 32 | (day - day.min(initial=0))
+    for days in [int(days) for days in windows]:
+        window_start = np.searchsorted(key, key - days, side="left")
+        count, mean, std = _moments((history[:, :3] - before(window_start, [0, 1, 2])).T, pair_mean)
+        baselines[f"n_{days}d"] = count.astype(np.int64)
+        baselines[f"mean_{days}d"] = mean
+        baselines[f"std_{days}d"] = std
+        baselines[f"z_{days}d"] = _zscore(amount, mean, std, count, min_history)
+
+    _, ewma, ewm_std = _moments(history[:, 3:].T, pair_mean)
+    baselines["ewma"] = ewma
+    baselines["ewm_std"] = ewm_std
+    baselines["z_ewma"] = _zscore(amount, ewma, ewm_std, history[:, 0], min_history)
+    return baselines
+
+# -----------------------------
+# 🚨 Function: Baseline Alerts
+# -----------------------------
+
+def baseline_alerts(baselines, threshold=Z_THRESHOLD):
+    """
+    Transactions more than `threshold` standard deviations above any of their
+    own baselines, with the largest such score as `max_z`, highest first.
+    """
+    z_columns = [col for col in baselines.columns if col.startswith("z_")]
+    max_z = baselines[z_columns].max(axis=1)
+    alerts = baselines[max_z > threshold].assign(max_z=max_z[max_z > threshold])
+    return alerts.sort_values(["max_z", "id"], ascending=[False, True], ignore_index=True)
+
+
+if __name__ == "__main__":
+    baselines = transaction_baselines(connect_expenses(**connect_options(sys.argv)))
+    scored = baselines["z_ewma"].notna().sum()
+    pairs = len(baselines.drop_duplicates(["employee", "category"]))
+    print(f"📉 {len(baselines):,} transaction(s) across {pairs:,} employee × category pair(s); "
+          f"{scored:,} have at least {MIN_HISTORY} earlier purchases to score against")
+
+    alerts = baseline_alerts(baselines)
+    z_columns = [f"z_{days}d" for days in WINDOWS] + ["z_ewma"]
+    print(f"\n🚨 Purchases More Than {Z_THRESHOLD} SD Above the Employee's Own Baseline:")
+    print(alerts[["date", "employee", "category", "vendor", "amount", "ewma", *z_columns]].head(25).to_string(index=False)
+          if not alerts.empty else "None")
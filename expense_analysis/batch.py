@@ -0,0 +1,124 @@
+# ============================================================
+# 🏢 batch.py
+# ------------------------------------------------------------
+"""
+Runs the analysis suite for many company exports in parallel.
+Takes a directory or glob of CSV/Parquet files, hands one file (entity) to
+each worker in a process pool, and merges every result table into one
+combined output labeled by entity (the file's path under the source folder).
+
+Usage (from the project folder):
+    python -m expense_analysis.batch "exports/*.csv" [--workers 8] [--out outputs/batch] [--stream | --warehouse]
+"""
+
+import argparse
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from expense_analysis import duplicates, runner, segments
+from expense_analysis.loader import connect_expenses
+from expense_analysis.policy import evaluate_policies, load_rules
+
+OUTPUT_DIR = Path("outputs/batch")
+
+# -----------------------------
+# 🔍 Function: Resolve Entity Files
+# -----------------------------
+
+def entity_files(source):
+    """Expand a directory or glob into a sorted list of expense files."""
+    source = str(source)
+    if os.path.isdir(source):
+        paths = [p for ext in ("*.csv", "*.parquet") for p in glob.glob(os.path.join(source, ext))]
+    else:
+        paths = glob.glob(source)
+    return sorted(paths)
+
+
+def entity_labels(paths):
+    """
+    One label per file: its path relative to the files' common folder, without
+    the extension (east/acme for exports/east/acme.csv), so files with the
+    same name in different folders stay apart. The extension is kept only
+    when two files differ by nothing else.
+    """
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    relative = [Path(os.path.relpath(os.path.abspath(p), root)) for p in paths]
+    labels = [rel.with_suffix("").as_posix() for rel in relative]
+    if len(set(labels)) < len(labels):
+        labels = [rel.as_posix() for rel in relative]
+    return labels
+
+# -----------------------------
+# ⚙️ Function: Analyze One Entity (worker)
+# -----------------------------
+
+def analyze_entity(path, rules, streaming=False, warehouse=False, entity=None):
+    """Run the text-based suite for one export; returns {table name: DataFrame}, labeled with `entity`."""
+    con = connect_expenses(path, streaming=streaming, warehouse=warehouse)
+    aggs = runner.compute_aggregates(con)
+    scores = segments.segment_outliers(con)
+
+    results = {
+        "category_share": runner.category_share(aggs),
+        "monthly_spend": runner.monthly_spend(aggs),
+        "same_day_repeats": runner.same_day_repeats(aggs),
+        "vendor_summary": runner.vendor_summary(aggs),
+        "policy_violations": evaluate_policies(con, rules),
+        "employee_scores": scores["employee"],
+        "vendor_scores": scores["vendor"],
+        "flagged_transactions": scores["transaction"],
+        "missing_segments": scores["missing"],
+        "near_duplicates": duplicates.near_duplicates(con),
+        "split_purchases": duplicates.split_purchases(con, rules),
+    }
+    con.close()
+
+    entity = entity or Path(path).stem
+    return {name: frame.assign(entity=entity) for name, frame in results.items()}
+
+# -----------------------------
+# 🚀 Function: Run Batch
+# -----------------------------
+
+def run_batch(source, workers=None, output_dir=OUTPUT_DIR, streaming=False, warehouse=False):
+    """Analyze every entity file in parallel and write one combined CSV per table."""
+    paths = entity_files(source)
+    if not paths:
+        raise FileNotFoundError(f"No expense files match {source}")
+
+    rules = load_rules()
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        per_entity = list(pool.map(analyze_entity, paths, [rules] * len(paths),
+                                   [streaming] * len(paths), [warehouse] * len(paths), entity_labels(paths)))
+
+    combined = {}
+    for name in per_entity[0]:
+        frames = [results[name] for results in per_entity if not results[name].empty]
+        combined[name] = pd.concat(frames, ignore_index=True) if frames else per_entity[0][name]
+        combined[name] = combined[name][["entity", *combined[name].columns.drop("entity")]]
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for name, frame in combined.items():
+        frame.to_csv(output_dir / f"{name}.csv", index=False)
+
+    print(f"🏢 Analyzed {len(paths)} entit{'y' if len(paths) == 1 else 'ies'} with {workers} worker(s)")
+    print(f"💾 Wrote {len(combined)} combined table(s) to {output_dir}/")
+    return combined
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the expense analysis suite for many company files.")
+    parser.add_argument("source", help="directory or glob of company CSV/Parquet exports")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--out", default=OUTPUT_DIR, help="directory for combined outputs")
+    parser.add_argument("--stream", action="store_true", help="let DuckDB read each file directly")
+    parser.add_argument("--warehouse", action="store_true", help="query each file's persistent warehouse DB")
+    args = parser.parse_args()
+    run_batch(args.source, args.workers, args.out, args.stream, args.warehouse)
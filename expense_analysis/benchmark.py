@@ -0,0 +1,175 @@
+# ============================================================
+# ⏱️ benchmark.py
+# ------------------------------------------------------------
+"""
+Benchmarks the analysis stages (load, compact load, query, z-score, pivot, plot) on
+synthetic datasets of increasing size. Each size runs in a fresh child
+process so its peak RSS is measured on its own. Results are saved as JSON
+(with the git commit) so runs from different versions can be compared.
+
+Usage (from the project folder):
+    python -m expense_analysis.benchmark --sizes 10000 100000 1000000
+    python -m expense_analysis.benchmark --compare outputs/benchmarks/old.json outputs/benchmarks/new.json
+"""
+
+import argparse
+import io
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+SYNTHETIC_DIR = Path("data/synthetic")
+RESULTS_DIR = Path("outputs/benchmarks")
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# -----------------------------
+# 🧪 Stages (run inside the child process)
+# -----------------------------
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_stages(path):
+    """Time each analysis stage on one dataset; returns a result dict."""
+    stages = {}
+
+    def timed(name, fn):
+        start = time.perf_counter()
+        result = fn()
+        stages[name] = {"seconds": round(time.perf_counter() - start, 4), "peak_rss_mb": round(_peak_rss_mb(), 1)}
+        return result
+
+    from expense_analysis.loader import _cache_dir, _remove_stale, cached_table_path, load_expenses
+
+    # Load: first call parses the CSV and writes the cache, second memory-maps it.
+    # Only this source's Parquet cache and fingerprint go: other sizes share the
+    # stem prefix (expenses_10000 / expenses_1000000-*) and keep theirs.
+    stem = Path(path).stem
+    _remove_stale(_cache_dir(path), stem, ".parquet")
+    (_cache_dir(path) / f"{stem}.json").unlink(missing_ok=True)
+    timed("load_cold", lambda: cached_table_path(path))
+    df = timed("load_warm", lambda: load_expenses(path))
+
+    from expense_analysis.compact import load_compact
+
+    compact = timed("load_compact", lambda: load_compact(path))
+
+    import duckdb
+    from expense_analysis import runner, segments
+    from expense_analysis.calendar_dim import register_calendar
+
+    def query():
+        con = register_calendar(compact.register(duckdb.connect()), years=compact.years())
+        aggs = runner.compute_aggregates(con)
+        segments.segment_outliers(con)
+        return aggs
+
+    aggs = timed("query", query)
+
+    from expense_analysis.outliers import zscore
+
+    timed("zscore", lambda: df.groupby(["department", "category"])["amount"].transform(
+        lambda s: zscore(s) if len(s) > 1 else 0.0))
+
+    pivot = timed("pivot", lambda: runner.category_share(aggs).pivot(
+        index="department", columns="category", values="percent_of_dept_spend"))
+
+    def plot():
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        plt.figure(figsize=(10, 6))
+        sns.heatmap(pivot, annot=True, cmap="coolwarm", center=0, fmt=".1f")
+        buffer = io.BytesIO()
+        plt.savefig(buffer, format="png", dpi=300, bbox_inches="tight")
+        plt.close("all")
+
+    timed("plot", plot)
+    return {"rows": len(df), "stages": stages, "peak_rss_mb": round(_peak_rss_mb(), 1)}
+
+# -----------------------------
+# 🏁 Function: Run Benchmark Suite
+# -----------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, output=None, seed=0):
+    """Generate (if needed) and benchmark each size; writes and returns the JSON report."""
+    from expense_analysis.synthetic import generate
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": [],
+    }
+    for size in sizes:
+        path = SYNTHETIC_DIR / f"expenses_{size}.csv"
+        if not path.exists():
+            start = time.perf_counter()
+            generate(size, path, seed=seed)
+            print(f"🧪 Generated {size:,} rows in {time.perf_counter() - start:.1f}s")
+
+        child = subprocess.run([sys.executable, "-m", "expense_analysis.benchmark", "--child", str(path)],
+                               capture_output=True, text=True, check=True)
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        report["results"].append({"size": size, **result})
+        timings = ", ".join(f"{name} {s['seconds']:.2f}s" for name, s in result["stages"].items())
+        print(f"⏱️ {size:>12,} rows: {timings} | peak RSS {result['peak_rss_mb']:.0f} MB")
+
+    output = Path(output or RESULTS_DIR / f"bench-{report['commit'] or 'local'}-{int(time.time())}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"💾 Saved results to {output}")
+    return report
+
+# -----------------------------
+# 📈 Function: Compare Two Reports
+# -----------------------------
+
+def compare(old_path, new_path):
+    """Print per-stage time ratios (new / old) for sizes present in both reports."""
+    old = {r["size"]: r for r in json.loads(Path(old_path).read_text())["results"]}
+    new = {r["size"]: r for r in json.loads(Path(new_path).read_text())["results"]}
+    for size in sorted(old.keys() & new.keys()):
+        parts = []
+        for stage, timing in new[size]["stages"].items():
+            before = old[size]["stages"].get(stage, {}).get("seconds")
+            if before:
+                parts.append(f"{stage} x{timing['seconds'] / before:.2f}")
+        rss = new[size]["peak_rss_mb"] / old[size]["peak_rss_mb"]
+        print(f"📈 {size:>12,} rows: {', '.join(parts)} | peak RSS x{rss:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the analysis stages on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--out", help="path of the JSON report")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two saved reports")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_stages(args.child)))
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        run_benchmarks(args.sizes, args.out, args.seed)
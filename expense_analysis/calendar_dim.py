@@ -0,0 +1,157 @@
+# ============================================================
+# 📅 calendar_dim.py
+# ------------------------------------------------------------
+"""
+Calendar dimension: one row per date with weekday, weekend, holiday and
+fiscal period columns, built once per run and joined to transactions by
+date key instead of recomputed per row. Holidays come from rules in
+config/holidays.csv (fixed dates or "nth weekday of the month", per
+region), so the calendar covers any range of years without a hand-kept
+list of dates that silently runs out.
+
+Usage (from the project folder):
+    python -m expense_analysis.calendar_dim [first_year last_year]
+"""
+
+import sys
+import warnings
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HOLIDAYS_PATH = Path("config/holidays.csv")
+REGION = "US"
+FISCAL_YEAR_START_MONTH = 1        # 7 would make July the first fiscal month
+FIRST_YEAR = 2000
+YEARS_AHEAD = 5                    # default calendars run this many years past today
+
+EPOCH = np.datetime64("1970-01-01", "D")
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+# -----------------------------
+# 🎉 Function: Holidays
+# -----------------------------
+
+def load_holiday_rules(path=HOLIDAYS_PATH):
+    """Read the holiday rule table and validate it."""
+    rules = pd.read_csv(path, dtype={"weekday": "string"})
+    fixed = rules["day"].notna()
+    nth = rules["weekday"].notna() & rules["nth"].notna()
+    if not (fixed ^ nth).all():
+        bad = ", ".join(rules.loc[~(fixed ^ nth), "name"])
+        raise ValueError(f"Holiday rules need either a day or a weekday + nth: {bad}")
+    unknown = set(rules["weekday"].dropna()) - set(WEEKDAYS)
+    if unknown:
+        raise ValueError(f"Unknown weekday code(s): {', '.join(sorted(unknown))}")
+    return rules
+
+
+def holiday_dates(first_year, last_year, region=REGION, rules=None):
+    """Holiday dates (and names) for every year in range, from the rule table."""
+    if rules is None:
+        rules = load_holiday_rules()
+    rules = rules[rules["region"] == region]
+    holidays = []
+    for year in range(first_year, last_year + 1):
+        for rule in rules.itertuples():
+            month = int(rule.month)
+            if pd.notna(rule.day):
+                day = date(year, month, int(rule.day))
+            else:
+                # nth weekday of the month; a negative nth counts from the month's end
+                weekday, nth = WEEKDAYS.index(rule.weekday), int(rule.nth)
+                days = pd.date_range(date(year, month, 1), periods=31, freq="D")
+                days = days[(days.month == month) & (days.weekday == weekday)]
+                day = days[nth - 1 if nth > 0 else nth].date()
+            holidays.append((day, rule.name))
+    return pd.DataFrame(holidays, columns=["date", "holiday_name"]).astype({"date": "datetime64[s]"})
+
+# -----------------------------
+# 🗓️ Function: Build Calendar
+# -----------------------------
+
+def build_calendar(first_year=FIRST_YEAR, last_year=None, region=REGION,
+                   fiscal_start_month=FISCAL_YEAR_START_MONTH, rules=None):
+    """
+    One row per date from Jan 1 of first_year to Dec 31 of last_year:
+    date_key (days since 1970-01-01), date, month ('YYYY-MM'), weekday
+    (0 = Monday), day_name, is_weekend, is_holiday, holiday_name and
+    fiscal_year / fiscal_quarter / fiscal_month.
+    """
+    last_year = last_year or date.today().year + YEARS_AHEAD
+    days = pd.date_range(date(first_year, 1, 1), date(last_year, 12, 31), freq="D")
+    holidays = holiday_dates(first_year, last_year, region, rules).drop_duplicates("date").set_index("date")
+
+    # Fiscal month 1 is fiscal_start_month; the fiscal year is named for the year it ends in
+    shifted = (days.month - fiscal_start_month) % 12
+    calendar = pd.DataFrame({
+        "date_key": ((days.to_numpy().astype("datetime64[D]") - EPOCH).astype(np.int32)),
+        "date": days,
+        "month": days.strftime("%Y-%m"),
+        "weekday": days.weekday.astype(np.int8),
+        "day_name": days.day_name(),
+        "is_weekend": days.weekday >= 5,
+        "holiday_name": holidays["holiday_name"].reindex(days).to_numpy(),
+        "fiscal_year": (days.year + (fiscal_start_month > 1) * (days.month >= fiscal_start_month)).astype(np.int16),
+        "fiscal_quarter": (shifted // 3 + 1).astype(np.int8),
+        "fiscal_month": (shifted + 1).astype(np.int8),
+    })
+    calendar.insert(6, "is_holiday", calendar["holiday_name"].notna())
+    return calendar
+
+
+_calendars = {}
+
+
+def default_calendar(years=None):
+    """
+    The default calendar, built once per process. `years` is the (first, last)
+    year of the data; if it reaches past FIRST_YEAR or YEARS_AHEAD, the
+    calendar is rebuilt wide enough to cover it.
+    """
+    first, last = FIRST_YEAR, date.today().year + YEARS_AHEAD
+    if years:
+        first, last = min(first, years[0]), max(last, years[1])
+    calendar = _calendars.get("default")
+    if calendar is None or calendar["date"].iat[0].year > first or calendar["date"].iat[-1].year < last:
+        _calendars["default"] = build_calendar(first, last)
+    return _calendars["default"]
+
+# -----------------------------
+# 🔗 Functions: Join by Date Key
+# -----------------------------
+
+def lookup(calendar, date_keys, column):
+    """
+    Calendar `column` for an array of date keys (day numbers), by direct array
+    indexing. Dates outside the calendar get None (False for flags), with a warning.
+    """
+    from expense_analysis.compact import MISSING_DAY
+
+    keys = np.asarray(date_keys) - calendar["date_key"].iat[0]
+    inside = (keys >= 0) & (keys < len(calendar))
+    outside = ~inside & (np.asarray(date_keys) != MISSING_DAY)
+    if outside.any():
+        warnings.warn(f"{int(outside.sum())} date(s) fall outside the calendar "
+                      f"({calendar['date'].iat[0]:%Y-%m-%d} – {calendar['date'].iat[-1]:%Y-%m-%d}); "
+                      f"their {column} is left empty", stacklevel=2)
+    values = calendar[column].to_numpy()
+    result = np.zeros(len(keys), dtype=values.dtype) if values.dtype == bool else np.full(len(keys), None, dtype=object)
+    result[inside] = values[keys[inside]]
+    return result
+
+
+def register_calendar(con, calendar=None, name="calendar", years=None):
+    """Expose the calendar (by default one covering `years`) to DuckDB so queries can join it on date."""
+    con.register(name, default_calendar(years) if calendar is None else calendar)
+    return con
+
+
+if __name__ == "__main__":
+    years = [int(arg) for arg in sys.argv[1:3]]
+    cal = build_calendar(*years) if years else default_calendar()
+    print(f"📅 Calendar {cal['date'].min():%Y-%m-%d} – {cal['date'].max():%Y-%m-%d} "
+          f"({len(cal):,} days, {int(cal['is_holiday'].sum())} {REGION} holidays)")
+    print(cal[cal["is_holiday"]].tail(10).to_string(index=False))
@@ -0,0 +1,340 @@
+# ============================================================
+# 🖼️ charts.py
+# ------------------------------------------------------------
+"""
+Chart builders for the finalized analyses plus a headless render mode.
+Interactive runs draw and show each figure as before. With --headless,
+figures are rendered with the Agg backend in a process pool, and each chart
+is keyed on a hash of its input data, its parameters and its builder's
+source; charts whose key is already in the cache are copied, not redrawn.
+
+Transaction-level charts are aggregated before matplotlib sees them: the
+reducers below turn any number of rows into quantile bands, a density grid
+or top-N slices with NumPy, and cap the individual points drawn, so the
+time to draw (and to hash and ship data to the render pool) stays flat as
+the data grows.
+"""
+
+import filecmp
+import hashlib
+import inspect
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HEADLESS_FLAG = "--headless"
+CHART_CACHE_DIR = Path("data/.cache/charts")
+
+MAX_POINTS = 1_000                   # individual markers per chart; beyond this, bands + extremes
+MAX_BARS = 40                        # bars per bar chart (largest first)
+TOP_N = 8                            # pie slices before the rest are merged into "Other"
+BAND_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+DENSITY_BINS = (60, 40)              # (x, y) bins of a density grid
+
+# -----------------------------
+# 📉 Reducers: Aggregate Before Drawing
+# -----------------------------
+
+def top_n_other(frame, label, value, n=TOP_N):
+    """Total `value` per `label`: the n largest (in label order), then one "Other (k)" row for the rest."""
+    totals = frame.groupby(label)[value].sum()
+    if len(totals) > n + 1:
+        top = totals.nlargest(n).sort_index()
+        rest = totals.drop(top.index)
+        totals = pd.concat([top, pd.Series({f"Other ({len(rest)})": rest.sum()})])
+    return totals.rename_axis(label).reset_index(name=value)
+
+
+def transaction_summary(frame, by, value, max_points=MAX_POINTS, quantiles=BAND_QUANTILES):
+    """
+    Everything a per-transaction chart needs, in size independent of the rows:
+    per-group count and quantile bands (q05 … q95), the overall mean / std,
+    and at most `max_points` rows to mark individually (all of them when they
+    fit, else those furthest from the mean).
+    """
+    frame = frame[frame[value].notna()]
+    if frame[by].isna().any():
+        frame = frame.assign(**{by: frame[by].astype(object).where(frame[by].notna(), "Unknown")})
+    values = frame[value].to_numpy(dtype=float)
+    codes, groups = pd.factorize(frame[by])
+    counts = np.bincount(codes, minlength=len(groups))
+    ordered = values[np.lexsort((values, codes))]
+    starts = np.cumsum(counts) - counts
+
+    bands = pd.DataFrame({by: groups, "count": counts})
+    for q in quantiles:
+        position = starts + q * (counts - 1)
+        low, high = np.floor(position).astype(int), np.ceil(position).astype(int)
+        bands[f"q{round(q * 100):02d}"] = ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+    mean = values.mean() if len(values) else np.nan
+    std = values.std(ddof=1) if len(values) > 1 else np.nan
+    keep = np.arange(len(values))
+    if len(values) > max_points:
+        keep = np.sort(np.argpartition(-np.abs(values - mean), max_points)[:max_points])
+    points = frame.iloc[keep][[by, value]].reset_index(drop=True)
+    return {"bands": bands, "points": points, "mean": mean, "std": std, "count": len(values)}
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        days = values.astype("datetime64[D]")
+        return np.where(np.isnat(days), np.nan, days.astype(np.int64))
+    return values.astype(float)
+
+
+def density_grid(x, y, bins=DENSITY_BINS):
+    """
+    2D histogram of two arrays: counts plus bin edges. Dates (datetime64) become
+    day numbers since 1970-01-01, which is also matplotlib's date unit. Pairs
+    with a missing or non-finite value are left out.
+    """
+    x, y = _as_float(x), _as_float(y)
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y = x[finite], y[finite]
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    return {"counts": counts, "x_edges": x_edges, "y_edges": y_edges}
+
+# -----------------------------
+# 📊 Builders (data, **params) -> figure
+# -----------------------------
+
+def benchmark_heatmap(pivot_table):
+    """01: deviation from expected benchmark by department and category."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(10, 6))
+    sns.heatmap(pivot_table, annot=True, cmap="coolwarm", center=0, fmt=".1f")
+    plt.title("Deviation from Expected Benchmark by Category Tier")
+    plt.ylabel("Department")
+    plt.xlabel("Category")
+    plt.tight_layout()
+    return fig
+
+
+def monthly_trend_line(monthly_trend, title):
+    """02: monthly spend line for one segment."""
+    import matplotlib.pyplot as plt
+
+    ax = monthly_trend.plot(kind='line', marker='o', figsize=(10, 4))
+    plt.title(title)
+    plt.ylabel('Amount ($)')
+    plt.xticks(rotation=45)
+    plt.grid(axis='y', linestyle='--', alpha=0.4)
+    plt.tight_layout()
+    return ax.figure
+
+
+def employee_share_bar(emp_summary, title, z_threshold=1.0, max_bars=MAX_BARS):
+    """02: each employee's % of segment spend, outliers in orange, equal share dashed."""
+    import matplotlib.pyplot as plt
+
+    employees = emp_summary.shape[0]
+    if employees > max_bars:
+        emp_summary = emp_summary.nlargest(max_bars, 'percent_of_total')
+        title = f"{title} (top {max_bars} of {employees:,})"
+
+    fig = plt.figure(figsize=(10, 6))
+    bars = plt.bar(emp_summary['employee'], emp_summary['percent_of_total'], color='skyblue')
+
+    for bar, z in zip(bars, emp_summary['z_score']):
+        if abs(z) > z_threshold:
+            bar.set_color('orange')
+
+    plt.axhline(100 / employees, color='red', linestyle='--', label='Expected Share')
+    plt.title(title)
+    plt.ylabel('Percent of Total Spend')
+    plt.xticks(rotation=45)
+    plt.legend()
+    plt.grid(axis='y', linestyle='--', alpha=0.5)
+    plt.tight_layout()
+    return fig
+
+
+def vendor_pie(vendor_data, title):
+    """02: vendor share of segment spend (pass top_n_other() output for many vendors)."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(6, 6))
+    plt.pie(vendor_data['amount'], labels=vendor_data['vendor'],
+            autopct='%1.1f%%', startangle=140,
+            colors=sns.color_palette("pastel"))
+    plt.title(title)
+    plt.tight_layout()
+    return fig
+
+
+def transaction_strip(summary, title, highlight):
+    """
+    02: transactions by employee with mean and +1/+2 SD lines, from
+    transaction_summary(). Every transaction is a dot while they fit;
+    beyond that each employee gets a q05–q95 / q25–q75 band with a median
+    tick, and only the most extreme transactions are drawn as dots.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    bands, points = summary["bands"], summary["points"].copy()
+    points['highlight'] = np.where(points['employee'] == highlight, highlight, 'Other')
+    palette = {highlight: 'red', 'Other': 'gray'}
+
+    fig = plt.figure(figsize=(12, 6))
+    if len(points) == summary["count"]:
+        sns.stripplot(data=points, x='employee', y='amount',
+                      hue='highlight', palette=palette,
+                      size=12, jitter=False, alpha=0.8, zorder=3)
+    else:
+        x = np.arange(len(bands))
+        colors = np.where(bands['employee'] == highlight, 'red', 'gray')
+        plt.vlines(x, bands['q05'], bands['q95'], colors=colors, linewidth=2, alpha=0.5, zorder=2)
+        plt.vlines(x, bands['q25'], bands['q75'], colors=colors, linewidth=8, alpha=0.6, zorder=2)
+        plt.scatter(x, bands['q50'], marker='_', s=120, color='black', zorder=3)
+        position = pd.Series(x, index=bands['employee'])
+        for name, rows in points.groupby('highlight'):
+            plt.scatter(position[rows['employee']].to_numpy(), rows['amount'],
+                        s=20, color=palette[name], alpha=0.8, zorder=4, label=name)
+        if len(bands) <= MAX_BARS:
+            plt.xticks(x, bands['employee'], rotation=45)
+        else:
+            plt.xticks([])
+        title = f"{title} ({summary['count']:,} transactions: bands q05–q95, {len(points):,} most extreme shown)"
+
+    for i in range(3):
+        y_val = summary["mean"] + i * summary["std"]
+        plt.axhline(y_val, color='blue', linestyle='--', linewidth=1.2)
+        label = f"{'Mean (0 SD)' if i == 0 else f'+{i} SD'}"
+        plt.text(len(bands), y_val + 5, label,
+                 color='blue', fontsize=10, va='bottom')
+
+    plt.title(title)
+    plt.ylabel("Transaction Amount ($)")
+    plt.xlabel("Employee")
+    plt.grid(axis='y', linestyle='--', alpha=0.3)
+    plt.legend(title='Legend', loc='upper left')
+    plt.tight_layout()
+    return fig
+
+
+def transaction_density(grid, title):
+    """02: transaction count by date and amount, from density_grid() over day numbers."""
+    import matplotlib.dates as mdates
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(12, 5))
+    counts = np.ma.masked_equal(grid["counts"].T, 0)
+    mesh = plt.pcolormesh(grid["x_edges"], grid["y_edges"], counts, cmap="viridis", shading="flat")
+    plt.colorbar(mesh, label="Transactions")
+    locator = mdates.AutoDateLocator()
+    plt.gca().xaxis.set_major_locator(locator)
+    plt.gca().xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    plt.title(title)
+    plt.ylabel("Transaction Amount ($)")
+    plt.xlabel("Date")
+    plt.tight_layout()
+    return fig
+
+# -----------------------------
+# 🔑 Function: Chart Key
+# -----------------------------
+
+def chart_key(builder, data, params, dpi):
+    """Content hash of a chart: builder source, parameters, resolution and input data."""
+    digest = hashlib.sha256()
+    digest.update(inspect.getsource(builder).encode())
+    digest.update(json.dumps({**params, "dpi": dpi}, sort_keys=True, default=str).encode())
+    _hash_data(digest, data)
+    return digest.hexdigest()
+
+
+def _hash_data(digest, data):
+    # Frames and arrays by content; dicts (reducer output) item by item
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        labels = list(data.columns) if isinstance(data, pd.DataFrame) else [data.name]
+        digest.update(repr((labels, list(data.index.names))).encode())
+        digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    elif isinstance(data, np.ndarray):
+        digest.update(repr((data.dtype.str, data.shape)).encode())
+        digest.update(np.ascontiguousarray(data).tobytes())
+    elif isinstance(data, dict):
+        for key in sorted(data):
+            digest.update(repr(key).encode())
+            _hash_data(digest, data[key])
+    else:
+        digest.update(repr(data).encode())
+
+# -----------------------------
+# 🚀 Function: Render Charts
+# -----------------------------
+
+def _render(builder, data, params, dpi, cache_path):
+    """Worker: draw one chart with the Agg backend and save it to the cache."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig = builder(data, **params)
+    tmp_path = cache_path.with_suffix(".tmp.png")
+    fig.savefig(tmp_path, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+class ChartBatch:
+    """Collects a script's charts; shows them one by one, or renders them headless in parallel."""
+
+    def __init__(self, headless=False, save_when_shown=True, cache_dir=CHART_CACHE_DIR):
+        self.headless = headless
+        self.save_when_shown = save_when_shown
+        self.cache_dir = Path(cache_dir)
+        self.pending = []
+
+    def add(self, builder, data, output_path=None, dpi=100, **params):
+        """Show the chart now (interactive) or queue it for render() (headless)."""
+        if not self.headless:
+            import matplotlib.pyplot as plt
+
+            fig = builder(data, **params)
+            if output_path and self.save_when_shown:
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                fig.savefig(output_path, dpi=dpi, bbox_inches="tight")
+            plt.show()
+            return
+        cache_path = self.cache_dir / f"{chart_key(builder, data, params, dpi)}.png"
+        self.pending.append((builder, data, params, dpi, cache_path, Path(output_path)))
+
+    def render(self, workers=None):
+        """Render queued charts missing from the cache; returns {output path: status}."""
+        if not self.pending:
+            return {}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        jobs = [job[:5] for job in self.pending if not job[4].exists()]
+        if jobs:
+            with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(jobs))) as pool:
+                list(pool.map(_render, *zip(*jobs)))
+
+        rendered = {job[4] for job in jobs}
+        status = {}
+        for *_, cache_path, output_path in self.pending:
+            if cache_path in rendered:
+                status[output_path] = "rendered"
+            elif output_path.exists() and filecmp.cmp(cache_path, output_path, shallow=False):
+                status[output_path] = "unchanged"
+                continue
+            else:
+                status[output_path] = "cached"
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(cache_path, output_path)
+        self.pending = []
+
+        for output_path, state in status.items():
+            print(f"🖼️ {output_path} ({state})")
+        return status
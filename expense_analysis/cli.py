@@ -0,0 +1,138 @@
+# ============================================================
+# 🧭 cli.py
+# ------------------------------------------------------------
+"""
+One entry point for every analysis and tool.
+Dispatches `python -m expense_analysis <command> [args]` to the matching
+script or module without importing any of the others. matplotlib and
+seaborn are only imported by the stages that draw, and z-scores use NumPy
+rather than scipy, so text-only checks start fast. --import-time reports
+how long each heavy library took to import.
+
+Usage (from the project folder):
+    python -m expense_analysis                      # list commands
+    python -m expense_analysis policy --stream --import-time
+"""
+
+import builtins
+import runpy
+import sys
+import time
+from pathlib import Path
+
+IMPORT_TIME_FLAG = "--import-time"
+ROOT = Path(__file__).resolve().parents[1]
+
+# command -> ("script", path under the project) or ("module", dotted name)
+COMMANDS = {
+    "category-benchmarks": ("script", "scripts/01_category_benchmarks.py"),
+    "sales-office-supplies": ("script", "scripts/02_sales_office_supplies.py"),
+    "monthly": ("script", "exploration/03_monthly_spend.py"),
+    "policy": ("script", "exploration/04_policy_checks.py"),
+    "sales-check": ("script", "exploration/05_sales_check.py"),
+    "same-day": ("script", "exploration/06_same_day_vendor.py"),
+    "vendors": ("script", "exploration/07_vendor_concentration.py"),
+    "suite": ("module", "expense_analysis.runner"),
+    "segments": ("module", "expense_analysis.segments"),
+    "outliers": ("module", "expense_analysis.outliers"),
+    "baselines": ("module", "expense_analysis.baselines"),
+    "batch": ("module", "expense_analysis.batch"),
+    "pipeline": ("module", "expense_analysis.pipeline"),
+    "serve": ("module", "expense_analysis.service"),
+    "warehouse": ("module", "expense_analysis.warehouse"),
+    "partitions": ("module", "expense_analysis.partitions"),
+    "compact": ("module", "expense_analysis.compact"),
+    "calendar": ("module", "expense_analysis.calendar_dim"),
+    "query-cache": ("module", "expense_analysis.query_cache"),
+    "sketches": ("module", "expense_analysis.sketches"),
+    "synthetic": ("module", "expense_analysis.synthetic"),
+    "benchmark": ("module", "expense_analysis.benchmark"),
+    "trace": ("module", "expense_analysis.trace"),
+}
+
+HEAVY_MODULES = ["numpy", "pandas", "pyarrow", "duckdb", "scipy", "matplotlib", "seaborn"]
+
+# -----------------------------
+# ⏱️ Import Timing
+# -----------------------------
+
+class ImportTimer:
+    """Times the first import of each heavy library (outermost import only)."""
+
+    def __init__(self, modules=HEAVY_MODULES):
+        self.modules = set(modules)
+        self.seconds = {}
+        self.depth = 0
+        self.original = builtins.__import__
+
+    def __enter__(self):
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self.original
+
+    def _import(self, name, *args, **kwargs):
+        root = name.partition(".")[0]
+        if root not in self.modules or root in sys.modules or self.depth:
+            return self.original(name, *args, **kwargs)
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            return self.original(name, *args, **kwargs)
+        finally:
+            self.depth -= 1
+            self.seconds[root] = time.perf_counter() - start
+
+    def report(self, total):
+        imported = sum(self.seconds.values())
+        print(f"⚡ Imports: {imported:.2f}s of {total:.2f}s total")
+        for module in HEAVY_MODULES:
+            if module in self.seconds:
+                print(f"   {module:<11} {self.seconds[module]:.3f}s")
+            elif module not in sys.modules:
+                print(f"   {module:<11} not imported")
+
+# -----------------------------
+# 🚀 Function: Main
+# -----------------------------
+
+def run_command(command, args):
+    """Run one command as if it were invoked directly with `args`."""
+    kind, target = COMMANDS[command]
+    if kind == "script":
+        path = ROOT / target
+        sys.argv = [str(path), *args]
+        runpy.run_path(str(path), run_name="__main__")
+    else:
+        sys.argv = [target, *args]
+        runpy.run_module(target, run_name="__main__", alter_sys=True)
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ("-h", "--help") or argv[0] not in COMMANDS:
+        if argv and argv[0] not in ("-h", "--help"):
+            print(f"Unknown command: {argv[0]}\n")
+        print("usage: python -m expense_analysis <command> [args]\n\ncommands:")
+        for name, (_, target) in COMMANDS.items():
+            print(f"  {name:<22} {target}")
+        return 0 if not argv or argv[0] in ("-h", "--help") else 2
+
+    command, args = argv[0], argv[1:]
+    if IMPORT_TIME_FLAG not in args:
+        run_command(command, args)
+        return 0
+
+    args = [arg for arg in args if arg != IMPORT_TIME_FLAG]
+    start = time.perf_counter()
+    with ImportTimer() as timer:
+        try:
+            run_command(command, args)
+        finally:
+            timer.report(time.perf_counter() - start)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
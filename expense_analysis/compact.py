@@ -0,0 +1,216 @@
+# ============================================================
+# 🗜️ compact.py
+# ------------------------------------------------------------
+"""
+Compact in-memory representation of the transaction table.
+Dimensions are categoricals (small integer codes + one dictionary), amounts
+are integer cents, dates are int32 day numbers and boolean flags are packed
+eight to a byte. It is built straight from the dictionary-encoded Parquet
+cache, so no object-dtype strings are ever materialized. Rows are decoded
+only for the slices an analysis actually prints or plots.
+
+Usage (from the project folder):
+    python -m expense_analysis.compact [path]     # memory report
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from expense_analysis.loader import DATA_PATH, DIMENSIONS, cached_table_path, load_expenses
+
+EPOCH = np.datetime64("1970-01-01", "D")
+MISSING_DAY = np.iinfo(np.int32).min
+
+# Decodes the registered compact frame back into the usual expenses columns.
+# Amounts become DECIMAL(18, 2), so SUMs of cents are exact; a missing amount is NULL.
+VIEW_SQL = """
+    CREATE OR REPLACE VIEW {view} AS
+    SELECT
+        id,
+        CASE WHEN day = {missing} THEN NULL ELSE DATE '1970-01-01' + day END AS date,
+        department, vendor, employee, category,
+        CASE WHEN has_amount THEN CAST(CAST(amount_cents AS DECIMAL(18, 0)) * 0.01 AS DECIMAL(18, 2)) END AS amount
+    FROM {table}
+"""
+
+
+def _smallest_int(values):
+    # int32 when every value fits, otherwise int64
+    info = np.iinfo(np.int32)
+    if len(values) == 0 or (values.min() >= info.min and values.max() <= info.max):
+        return values.astype(np.int32)
+    return values.astype(np.int64)
+
+# -----------------------------
+# 🗜️ Class: Compact Expenses
+# -----------------------------
+
+class CompactExpenses:
+    """Transactions as integer codes, cents, day numbers and bit-packed flags."""
+
+    def __init__(self, ids, day, amount_cents, dimensions, flags=None, has_amount=None):
+        self.ids = ids
+        self.day = day
+        self.amount_cents = amount_cents      # 0 where the amount is missing
+        self.dimensions = dimensions          # name -> pd.Categorical
+        self.flags = dict(flags or {})        # name -> np.packbits array
+        self.n = len(ids)
+        # Packed validity bits for amount_cents (default: every amount present)
+        self.has_amount = np.packbits(np.ones(self.n, dtype=bool) if has_amount is None
+                                      else np.asarray(has_amount, dtype=bool))
+
+    @classmethod
+    def from_table(cls, table):
+        """Build from an Arrow table with the cached Parquet schema."""
+        dates = table.column("date").to_numpy().astype("datetime64[D]")
+        day = np.where(np.isnat(dates), MISSING_DAY, (dates - EPOCH).astype(np.int64))
+        cents = pc.round(pc.multiply(table.column("amount"), 100)).to_numpy()
+        dimensions = {
+            # Arrow dictionary columns convert to pandas categoricals without decoding
+            col: pd.Categorical(table.column(col).to_pandas()) for col in DIMENSIONS
+        }
+        return cls(
+            ids=_smallest_int(table.column("id").to_numpy()),
+            day=day.astype(np.int32),
+            amount_cents=_smallest_int(np.nan_to_num(cents).astype(np.int64)),
+            dimensions=dimensions,
+            has_amount=~np.isnan(cents),
+        )
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build from a loaded expenses DataFrame."""
+        dates = df["date"].to_numpy().astype("datetime64[D]")
+        day = np.where(np.isnat(dates), MISSING_DAY, (dates - EPOCH).astype(np.int64))
+        return cls(
+            ids=_smallest_int(df["id"].to_numpy()),
+            day=day.astype(np.int32),
+            amount_cents=_smallest_int(np.rint(df["amount"].fillna(0).to_numpy() * 100).astype(np.int64)),
+            dimensions={col: pd.Categorical(df[col]) for col in DIMENSIONS},
+            has_amount=df["amount"].notna().to_numpy(),
+        )
+
+    # -------- flags --------
+
+    def set_flag(self, name, mask):
+        """Store a boolean mask (one value per row) as a packed bit array."""
+        self.flags[name] = np.packbits(np.asarray(mask, dtype=bool))
+
+    def flag(self, name):
+        """Unpack a stored flag back to a boolean array."""
+        return np.unpackbits(self.flags[name], count=self.n).astype(bool)
+
+    def amount_mask(self):
+        """True for rows whose amount is present."""
+        return np.unpackbits(self.has_amount, count=self.n).astype(bool)
+
+    def add_calendar_flags(self, calendar=None):
+        """Weekend and holiday flags joined from the calendar dimension by day number."""
+        from expense_analysis.calendar_dim import default_calendar, lookup
+
+        calendar = default_calendar(self.years()) if calendar is None else calendar
+        self.set_flag("weekend", lookup(calendar, self.day, "is_weekend"))
+        self.set_flag("holiday", lookup(calendar, self.day, "is_holiday"))
+
+    def years(self):
+        """(first, last) year of the dated rows, or None if there are none."""
+        days = self.day[self.day != MISSING_DAY]
+        if not len(days):
+            return None
+        first, last = (EPOCH + np.array([days.min(), days.max()])).astype("datetime64[Y]").astype(int) + 1970
+        return int(first), int(last)
+
+    # -------- selection --------
+
+    def where(self, **equals):
+        """Boolean row mask for dimension == value filters, compared on integer codes."""
+        mask = np.ones(self.n, dtype=bool)
+        for col, value in equals.items():
+            categories = self.dimensions[col].categories
+            code = categories.get_loc(value) if value in categories else -2
+            mask &= self.dimensions[col].codes == code
+        return mask
+
+    def frame(self):
+        """The compact columns as a DataFrame (categoricals, int cents, int32 days)."""
+        return pd.DataFrame({
+            "id": self.ids,
+            "day": self.day,
+            **{col: self.dimensions[col] for col in DIMENSIONS},
+            "amount_cents": self.amount_cents,
+            "has_amount": self.amount_mask(),
+        })
+
+    def decode(self, rows=None):
+        """Decode rows (mask or indices; default all) into the usual expenses columns plus flags."""
+        rows = np.arange(self.n) if rows is None else np.flatnonzero(rows) if np.asarray(rows).dtype == bool else rows
+        day = self.day[rows]
+        decoded = pd.DataFrame({
+            "id": self.ids[rows].astype(np.int64),
+            "date": pd.to_datetime(np.where(day == MISSING_DAY, np.datetime64("NaT"), EPOCH + day)),
+            **{col: np.asarray(self.dimensions[col].take(rows), dtype=object) for col in DIMENSIONS},
+            "amount": np.where(self.amount_mask()[rows], self.amount_cents[rows] / 100, np.nan),
+        })
+        for name in self.flags:
+            decoded[name] = self.flag(name)[rows]
+        return decoded
+
+    def register(self, con, view="expenses"):
+        """Expose the compact frame to DuckDB as a decoded `view` (dimensions stay ENUMs)."""
+        table = f"{view}_compact"
+        con.register(table, self.frame())
+        con.execute(VIEW_SQL.format(view=view, table=table, missing=MISSING_DAY))
+        return con
+
+    def memory_usage(self):
+        """Bytes per column, flags included."""
+        usage = {"id": self.ids.nbytes, "date": self.day.nbytes,
+                 "amount": self.amount_cents.nbytes + self.has_amount.nbytes}
+        for col, values in self.dimensions.items():
+            usage[col] = values.codes.nbytes + values.categories.memory_usage(deep=True)
+        for name, bits in self.flags.items():
+            usage[name] = bits.nbytes
+        return usage
+
+# -----------------------------
+# 📦 Function: Load Compact
+# -----------------------------
+
+def load_compact(path=DATA_PATH, filters=None, partitioned=False):
+    """
+    Load the cached Parquet copy of a source file straight into a CompactExpenses.
+    With `filters` (department, category, start, end) only matching rows are
+    read; `partitioned` reads them from the partitioned dataset (see partitions.py).
+    """
+    if filters or partitioned:
+        from expense_analysis.partitions import read_filtered
+        return CompactExpenses.from_table(read_filtered(path, filters, partitioned))
+    return CompactExpenses.from_table(pq.read_table(cached_table_path(path), memory_map=True))
+
+# -----------------------------
+# 📊 Function: Memory Report
+# -----------------------------
+
+def memory_report(df, compact):
+    """Per-column bytes of a loaded frame vs its compact form, with a total row."""
+    before = df.memory_usage(deep=True, index=False)
+    after = pd.Series(compact.memory_usage())
+    report = pd.DataFrame({"frame_bytes": before, "compact_bytes": after}).fillna(0).astype(np.int64)
+    report.loc["total"] = report.sum()
+    report["saved_pct"] = (100 * (1 - report["compact_bytes"] / report["frame_bytes"].where(report["frame_bytes"] > 0))).round(1)
+    return report
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    frame = load_expenses(source)
+    compact = load_compact(source)
+    # A weekend flag as the pandas scripts add it (one bool per row) vs packed bits
+    frame["weekend"] = frame["date"].dt.dayofweek >= 5
+    compact.set_flag("weekend", frame["weekend"])
+    print(f"🗜️ Memory use for {len(frame):,} rows of {source}:")
+    print(memory_report(frame, compact).to_string())
@@ -0,0 +1,126 @@
+# ============================================================
+# 🏪 concentration.py
+# ------------------------------------------------------------
+"""
+Rolling vendor concentration per department.
+For every window end (month, week or day), each vendor's spend over the
+trailing N days comes from two ASOF lookups into per-vendor cumulative
+totals, so windows are never re-summed row by row. Share of spend, z-score,
+HHI and single-use flags are then window functions over each
+(department, window end), all in one DuckDB statement.
+"""
+
+WINDOW_DAYS = 90
+HARD_HIGH_PERCENT = 30
+Z_THRESHOLD = 1.96
+
+# Step -> SQL listing window end dates between first_day and last_day of the data
+STEPS = {
+    "month": "SELECT LAST_DAY(CAST(d AS DATE)) AS window_end FROM bounds, "
+             "generate_series(DATE_TRUNC('month', first_day), last_day, INTERVAL 1 MONTH) t(d)",
+    "week": "SELECT CAST(d AS DATE) AS window_end FROM bounds, "
+            "generate_series(first_day + 6, last_day, INTERVAL 7 DAY) t(d)",
+    "day": "SELECT CAST(d AS DATE) AS window_end FROM bounds, "
+           "generate_series(first_day, last_day, INTERVAL 1 DAY) t(d)",
+}
+
+# -----------------------------
+# 📈 Function: Rolling Vendor Concentration
+# -----------------------------
+
+def rolling_concentration(con, window_days=WINDOW_DAYS, step="month", by="department"):
+    """
+    One row per (department, window end, vendor) with spend in the trailing
+    `window_days`: total_spend, txn_count, percent_of_total, z_score,
+    vendor_count, hhi (0–10,000) and Flag. Pass by=None for company-wide
+    windows (department 'All').
+    """
+    if step not in STEPS:
+        raise ValueError(f"Unknown step {step!r}; expected one of {', '.join(STEPS)}")
+    days = int(window_days)
+    segment = by or "'All'"
+    return con.execute(f"""
+        WITH daily AS (
+            SELECT
+                {segment} AS department,
+                COALESCE(vendor, 'Unknown') AS vendor,
+                CAST(date AS DATE) AS day,
+                SUM(amount) AS spend,
+                COUNT(*) AS txns
+            FROM expenses
+            GROUP BY ALL
+        ),
+        cumulative AS (
+            SELECT
+                department, vendor, day,
+                SUM(spend) OVER running AS cum_spend,
+                SUM(txns) OVER running AS cum_txns
+            FROM daily
+            WINDOW running AS (PARTITION BY department, vendor ORDER BY day ROWS UNBOUNDED PRECEDING)
+        ),
+        bounds AS (
+            SELECT MIN(day) AS first_day, MAX(day) AS last_day FROM daily
+        ),
+        ends AS ({STEPS[step]}),
+        active AS (
+            -- Only windows that overlap a vendor's first..last purchase
+            SELECT p.department, p.vendor, e.window_end, e.window_end - {days} AS window_start
+            FROM (
+                SELECT department, vendor, MIN(day) AS first_day, MAX(day) AS last_day
+                FROM daily
+                GROUP BY ALL
+            ) p
+            JOIN ends e
+              ON p.first_day <= e.window_end
+             AND p.last_day > e.window_end - {days}
+        ),
+        windowed AS (
+            SELECT
+                a.department, a.window_end, a.vendor,
+                hi.cum_spend - COALESCE(lo.cum_spend, 0) AS total_spend,
+                hi.cum_txns - COALESCE(lo.cum_txns, 0) AS txn_count
+            FROM active a
+            ASOF JOIN cumulative hi
+              ON a.department = hi.department AND a.vendor = hi.vendor AND a.window_end >= hi.day
+            ASOF LEFT JOIN cumulative lo
+              ON a.department = lo.department AND a.vendor = lo.vendor AND a.window_start >= lo.day
+        ),
+        scored AS (
+            SELECT
+                *,
+                100.0 * total_spend / SUM(total_spend) OVER seg AS percent_of_total,
+                (total_spend - AVG(total_spend) OVER seg) / NULLIF(STDDEV_POP(total_spend) OVER seg, 0) AS z_score,
+                COUNT(*) OVER seg AS vendor_count
+            FROM windowed
+            WHERE txn_count > 0
+            WINDOW seg AS (PARTITION BY department, window_end)
+        )
+        SELECT
+            department, window_end, vendor, total_spend, txn_count,
+            ROUND(percent_of_total, 2) AS percent_of_total,
+            z_score, vendor_count,
+            ROUND(SUM(percent_of_total * percent_of_total) OVER (PARTITION BY department, window_end), 1) AS hhi,
+            CASE
+                WHEN percent_of_total >= {HARD_HIGH_PERCENT} THEN 'Hard High'
+                WHEN z_score > {Z_THRESHOLD} THEN 'Z Outlier'
+                WHEN txn_count = 1 THEN 'Single-Use Vendor'
+                ELSE 'OK'
+            END AS Flag
+        FROM scored
+        ORDER BY department, window_end, total_spend DESC
+    """).df()
+
+# -----------------------------
+# 📊 Function: Concentration Trend
+# -----------------------------
+
+def concentration_trend(rolling):
+    """Per (department, window end): HHI, vendor count, top vendor share and flag counts."""
+    top = rolling.drop_duplicates(["department", "window_end"])   # rows are sorted by spend
+    trend = top[["department", "window_end", "hhi", "vendor_count", "vendor", "percent_of_total"]].rename(
+        columns={"vendor": "top_vendor", "percent_of_total": "top_vendor_percent"})
+    flags = (rolling[rolling["Flag"] != "OK"]
+             .pivot_table(index=["department", "window_end"], columns="Flag", values="vendor",
+                          aggfunc="count", fill_value=0))
+    return trend.join(flags, on=["department", "window_end"]).fillna(
+        {flag: 0 for flag in flags.columns}).reset_index(drop=True)
@@ -0,0 +1,107 @@
+# ============================================================
+# 🔁 duplicates.py
+# ------------------------------------------------------------
+"""
+Near-duplicate and split-purchase detection.
+Goes beyond exact (employee, vendor, date) repeats: finds the same employee
+and vendor within N days with amounts inside a tolerance, and runs of
+purchases that are each under a per-transaction policy limit but together
+go over it. Neither compares every pair of transactions: near-duplicates
+use a banded self-join and split purchases a sorted RANGE window.
+"""
+
+from expense_analysis.policy import load_rules
+
+WINDOW_DAYS = 3
+AMOUNT_TOLERANCE = 0.05   # amounts within 5% of each other
+
+# -----------------------------
+# 🔍 Function: Near Duplicates
+# -----------------------------
+
+def near_duplicates(con, window_days=WINDOW_DAYS, tolerance=AMOUNT_TOLERANCE):
+    """
+    Pairs of transactions by the same employee at the same vendor within
+    `window_days` of each other whose amounts differ by at most `tolerance`
+    (a fraction of the larger amount).
+
+    Dates are cut into bands of `window_days + 1` days and each transaction is
+    joined on (employee, vendor, band) against its own band and the next one,
+    so a hash bucket only ever holds a few days of one employee's purchases.
+    """
+    days = int(window_days)
+    return con.execute(f"""
+        WITH banded AS (
+            SELECT *,
+                   DATE_DIFF('day', DATE '1970-01-01', CAST(date AS DATE)) // {days + 1} AS band
+            FROM expenses
+        ),
+        probes AS (
+            SELECT *, band AS join_band FROM banded
+            UNION ALL
+            SELECT *, band + 1 AS join_band FROM banded
+        )
+        SELECT
+            a.employee, a.vendor,
+            a.id AS first_id, b.id AS second_id,
+            a.date AS first_date, b.date AS second_date,
+            a.amount AS first_amount, b.amount AS second_amount,
+            DATE_DIFF('day', CAST(a.date AS DATE), CAST(b.date AS DATE)) AS days_apart
+        FROM probes a
+        JOIN banded b
+          ON a.employee = b.employee
+         AND a.vendor = b.vendor
+         AND a.join_band = b.band
+        WHERE (b.date > a.date OR (b.date = a.date AND a.id < b.id))
+          AND b.date <= a.date + INTERVAL {days} DAY
+          AND ABS(a.amount - b.amount) <= ? * GREATEST(ABS(a.amount), ABS(b.amount))
+        ORDER BY a.employee, a.vendor, a.date, a.id
+    """, [tolerance]).df()
+
+# -----------------------------
+# ✂️ Function: Split Purchases
+# -----------------------------
+
+def split_purchases(con, rules=None, window_days=WINDOW_DAYS):
+    """
+    Transactions that complete a run of purchases (same employee, vendor and
+    category within `window_days`) where every purchase is at or under the
+    per-transaction limit but the run's total is over it. Rules limited to a
+    department or employee apply only to its purchases, as in policy.py.
+    """
+    if rules is None:
+        rules = load_rules()
+    limits = rules.loc[rules["scope"] == "transaction", ["rule_id", "category", "department", "employee", "max_amount"]]
+    days = int(window_days)
+
+    con.register("split_limits", limits)
+    result = con.execute(f"""
+        WITH runs AS (
+            SELECT
+                id, date, department, employee, vendor, category, amount,
+                SUM(amount) OVER run AS run_total,
+                COUNT(*) OVER run AS run_count,
+                MAX(amount) OVER run AS run_max
+            FROM expenses
+            WINDOW run AS (
+                PARTITION BY employee, vendor, category
+                ORDER BY date
+                RANGE BETWEEN INTERVAL {days} DAY PRECEDING AND CURRENT ROW
+            )
+        )
+        SELECT
+            l.rule_id, r.id, r.date, r.employee, r.vendor, r.category,
+            r.amount, r.run_count, r.run_total, l.max_amount,
+            r.run_total - l.max_amount AS over_limit_by
+        FROM runs r
+        JOIN split_limits l
+          ON r.category = l.category
+         AND (l.department IS NULL OR r.department = l.department)
+         AND (l.employee IS NULL OR r.employee = l.employee)
+        WHERE r.run_count > 1
+          AND r.run_max <= l.max_amount
+          AND r.run_total > l.max_amount
+        ORDER BY r.employee, r.vendor, r.date
+    """).df()
+    con.unregister("split_limits")
+    return result
@@ -0,0 +1,227 @@
+# ============================================================
+# 📥 loader.py
+# ------------------------------------------------------------
+"""
+Loads SmallCompany.csv into a typed DataFrame, parsing the CSV only once.
+The parsed frame is written to a dictionary-encoded Parquet file keyed on
+the source's mtime and content hash; later runs memory-map that file.
+
+connect_expenses() exposes the same data to DuckDB as an `expenses` view,
+either from the loaded frame or, in streaming mode, straight from the files,
+optionally narrowed to a department, category or date range.
+"""
+
+import atexit
+import glob
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATA_PATH = Path("data/SmallCompany.csv")
+DATE_FORMAT = "%m/%d/%y"
+DIMENSIONS = ["department", "vendor", "employee", "category"]
+STREAM_FLAG = "--stream"
+WAREHOUSE_FLAG = "--warehouse"
+CACHE_FLAG = "--cache"
+PARTITION_FLAG = "--partitioned"
+
+# `date` is read as text and parsed with try_strptime, so a malformed date
+# becomes NULL in every mode, as parse_csv() turns it into NaT
+CSV_COLUMNS = {
+    "id": "BIGINT",
+    "date": "VARCHAR",
+    "department": "VARCHAR",
+    "vendor": "VARCHAR",
+    "employee": "VARCHAR",
+    "category": "VARCHAR",
+    "amount": "DOUBLE",
+}
+
+# -----------------------------
+# 🔑 Function: Source Fingerprint
+# -----------------------------
+
+def _cache_dir(path):
+    return Path(path).parent / ".cache"
+
+
+def _remove_stale(directory, stem, suffix, keep=None):
+    """
+    Delete a source's superseded cache files, `{stem}-<16 hex>{suffix}`, in
+    directory. Other sources whose names start with the stem (acme-east for
+    acme) never match, and a file another process already removed is fine.
+    """
+    pattern = re.compile(re.escape(stem) + r"-[0-9a-f]{16}" + re.escape(suffix))
+    for stale in Path(directory).glob(f"{glob.escape(stem)}-*{suffix}"):
+        if stale != keep and pattern.fullmatch(stale.name):
+            stale.unlink(missing_ok=True)
+
+
+def _hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path=DATA_PATH):
+    """Return the content hash of a source file, reusing it while mtime and size are unchanged."""
+    path = Path(path)
+    stat = path.stat()
+    meta_path = _cache_dir(path) / f"{path.stem}.json"
+
+    meta = {}
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+        if meta.get("mtime_ns") == stat.st_mtime_ns and meta.get("size") == stat.st_size:
+            return meta["sha256"]
+
+    meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size, sha256=_hash_file(path))
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+    meta_path.write_text(json.dumps(meta, indent=2))
+    return meta["sha256"]
+
+# -----------------------------
+# 🧹 Function: Parse CSV
+# -----------------------------
+
+def parse_csv(path=DATA_PATH):
+    """Parse the raw CSV into typed columns (categorical dimensions, real dates)."""
+    df = pd.read_csv(
+        path,
+        dtype={"id": "int64", "amount": "float64", **{col: "category" for col in DIMENSIONS}},
+    )
+    df["date"] = pd.to_datetime(df["date"], format=DATE_FORMAT, errors="coerce")
+    return df
+
+# -----------------------------
+# 📦 Function: Load Expenses
+# -----------------------------
+
+def cached_table_path(path=DATA_PATH):
+    """Return the Parquet cache for a source file, building it if the source changed."""
+    path = Path(path)
+    cache_path = _cache_dir(path) / f"{path.stem}-{source_fingerprint(path)[:16]}.parquet"
+    if not cache_path.exists():
+        _remove_stale(cache_path.parent, path.stem, ".parquet", keep=cache_path)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        parse_csv(path).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def load_expenses(path=DATA_PATH):
+    """Load the expense table, memory-mapping the cached Parquet copy of the CSV."""
+    table = pq.read_table(cached_table_path(path), memory_map=True)
+
+    # Dimensions stay dictionary-encoded on disk but come back as plain strings
+    # so existing pandas arithmetic and plotting behave exactly as with read_csv.
+    schema = pa.schema([
+        pa.field(field.name, pa.string()) if pa.types.is_dictionary(field.type) else field
+        for field in table.schema
+    ])
+    return table.cast(schema).to_pandas()
+
+# -----------------------------
+# 🦆 Function: DuckDB Connection
+# -----------------------------
+
+def scan_sql(path):
+    """DuckDB table function reading a CSV or Parquet file (or glob) in place."""
+    path = str(path).replace("'", "''")
+    if path.endswith(".parquet"):
+        return f"read_parquet('{path}')"
+    columns = ", ".join(f"'{name}': '{kind}'" for name, kind in CSV_COLUMNS.items())
+    return (f"(SELECT * REPLACE (CAST(try_strptime(date, '{DATE_FORMAT}') AS DATE) AS date) "
+            f"FROM read_csv('{path}', header = true, columns = {{{columns}}}))")
+
+
+def connect_options(argv, **filters):
+    """
+    connect_expenses() keyword arguments for a script's --stream/--warehouse/
+    --partitioned/--cache flags and its --department=/--category=/--from=/--to=
+    filters. Keyword `filters` are fixed by the script and override the flags.
+    """
+    from expense_analysis.partitions import parse_filters
+
+    options = {"streaming": STREAM_FLAG in argv, "warehouse": WAREHOUSE_FLAG in argv,
+               "partitioned": PARTITION_FLAG in argv}
+    filters = {**parse_filters(argv), **filters}
+    if filters:
+        options["filters"] = filters
+    if CACHE_FLAG in argv:
+        from expense_analysis.query_cache import QueryCache
+        options["cache"] = QueryCache()
+        atexit.register(lambda: print(options["cache"].summary()))
+    return options
+
+
+def connect_expenses(path=DATA_PATH, streaming=False, memory_limit=None, warehouse=False, cache=None,
+                     partitioned=False, filters=None):
+    """
+    Open a DuckDB connection with an `expenses` view and a `calendar`
+    dimension (one row per date, see calendar_dim.py) to join it with.
+    `filters` (department, category, start, end) narrow the view in every
+    mode. Partitioned mode reads the year/month/department Parquet dataset
+    (see partitions.py), where they prune whole partitions before any I/O.
+    With `cache` (True or a QueryCache), SELECT results are served from the
+    query result cache while the source data is unchanged (see query_cache.py).
+    Warehouse mode opens the persistent, indexed database file for the source
+    read-only instead (see warehouse.py), building it only if the source changed.
+    In-memory mode registers the compact table (dictionary-coded dimensions,
+    integer cents, int32 days) behind a view that decodes it, with amounts as
+    exact DECIMALs. Streaming mode points the view at the file(s) instead, so
+    filters and projections are pushed into the scan, large aggregates spill
+    to disk, and only query results reach pandas.
+    """
+    if partitioned:
+        from expense_analysis.partitions import connect_partitioned
+        con = connect_partitioned(path, filters)
+    else:
+        from expense_analysis.partitions import filter_view
+        con = filter_view(_open_connection(path, streaming, memory_limit, warehouse), filters)
+
+    from expense_analysis import trace
+    if trace.active():
+        # Under --trace every query's DuckDB profile goes into the running stage
+        con = trace.active().watch(con)
+
+    if cache:
+        from expense_analysis.query_cache import QueryCache, cached_connection
+        mode = "partitioned" if partitioned else "warehouse" if warehouse else "streaming" if streaming else "memory"
+        con = cached_connection(con, path, mode, cache if isinstance(cache, QueryCache) else None, filters)
+
+    # Registered after the cache wraps the connection, so the calendar's contents
+    # (holiday rules, years covered) are part of every cached result's key.
+    # It covers the data's years even when they fall outside its default range.
+    from expense_analysis.calendar_dim import register_calendar
+    first, last = con.execute("SELECT YEAR(MIN(date)), YEAR(MAX(date)) FROM expenses").fetchone()
+    return register_calendar(con, years=(first, last) if first is not None else None)
+
+
+def _open_connection(path, streaming, memory_limit, warehouse):
+    if warehouse:
+        from expense_analysis.warehouse import connect_warehouse
+        return connect_warehouse(path)
+
+    con = duckdb.connect()
+    if not streaming:
+        from expense_analysis.compact import load_compact
+        return load_compact(path).register(con)
+
+    spill_dir = _cache_dir(path) / "spill"
+    spill_dir.mkdir(parents=True, exist_ok=True)
+    con.execute(f"SET temp_directory = '{spill_dir.as_posix()}'")
+    con.execute("SET preserve_insertion_order = false")
+    if memory_limit:
+        con.execute(f"SET memory_limit = '{memory_limit}'")
+    con.execute(f"CREATE VIEW expenses AS SELECT * FROM {scan_sql(path)}")
+    return con
@@ -0,0 +1,271 @@
+# ============================================================
+# 🚩 outliers.py
+# ------------------------------------------------------------
+"""
+Online z-score outlier detection for transactions, employees and vendors.
+Keeps Welford running mean/variance state per department–category segment
+(and company-wide), so each new expense is scored and folded in in O(1)
+instead of re-running scipy.stats.zscore over every group. The highest id
+observed is saved with the baselines, so rerunning on the same or a
+cumulative export only folds in rows not seen before.
+
+Usage (from the project folder):
+    python -m expense_analysis.outliers path/to/new_expenses.csv
+"""
+
+import json
+import math
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# The loader (pandas, duckdb, pyarrow) is imported only where rows are loaded,
+# so importing zscore or RunningStats costs nothing beyond the standard library
+STATE_PATH = Path("data/.cache/outlier_state.json")
+COMPANY = ("All", "All")
+UNKNOWN = "Unknown"                # stands in for a blank department, category, employee or vendor
+
+# Same cut-offs as 02_sales_office_supplies.py
+THRESHOLDS = {"transaction": 1.5, "employee": 1.0, "vendor": 1.5}
+
+# -----------------------------
+# 📏 Batch Z-Scores
+# -----------------------------
+
+def zscore(values):
+    """(x - mean) / population std, as scipy.stats.zscore, without importing scipy (~1 s)."""
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    return (values - values.mean()) / values.std()
+
+# -----------------------------
+# 📐 Running Mean / Variance
+# -----------------------------
+
+class RunningStats:
+    """Welford accumulator; std is the population std (ddof=0) like scipy's zscore."""
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        delta = x - self.mean
+        self.count -= 1
+        self.mean -= delta / self.count
+        self.m2 = max(self.m2 - delta * (x - self.mean), 0.0)
+
+    def replace(self, old, new):
+        self.remove(old)
+        self.add(new)
+
+    def add_many(self, values):
+        """Fold in a batch of values at once (batch moments, then merge)."""
+        import numpy as np
+
+        values = np.asarray(values, dtype=float)
+        if len(values):
+            mean = values.mean()
+            self.merge(RunningStats(len(values), float(mean), float(((values - mean) ** 2).sum())))
+
+    def merge(self, other):
+        """Combine with another accumulator (Chan et al.), as if it had seen both streams."""
+        count = self.count + other.count
+        if not other.count:
+            return
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def zscore(self, x):
+        std = self.std
+        return (x - self.mean) / std if std > 0 else 0.0
+
+    def to_list(self):
+        return [self.count, self.mean, self.m2]
+
+# -----------------------------
+# 🧮 Segment State
+# -----------------------------
+
+class SegmentState:
+    """Baselines for one segment: transaction amounts plus employee and vendor totals."""
+
+    def __init__(self):
+        self.transactions = RunningStats()
+        self.totals = {"employee": defaultdict(float), "vendor": defaultdict(float)}
+        self.total_stats = {"employee": RunningStats(), "vendor": RunningStats()}
+
+    def observe(self, employee, vendor, amount):
+        """Score one transaction against the current baseline, then fold it in."""
+        scores = {"transaction": self.transactions.zscore(amount)}
+        self.transactions.add(amount)
+
+        for kind, name in (("employee", employee), ("vendor", vendor)):
+            totals, stats = self.totals[kind], self.total_stats[kind]
+            if name in totals:
+                stats.replace(totals[name], totals[name] + amount)
+            else:
+                stats.add(amount)
+            totals[name] += amount
+            scores[kind] = stats.zscore(totals[name])
+        return scores
+
+    def to_dict(self):
+        return {
+            "transactions": self.transactions.to_list(),
+            "totals": {kind: dict(totals) for kind, totals in self.totals.items()},
+            "total_stats": {kind: stats.to_list() for kind, stats in self.total_stats.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.transactions = RunningStats(*data["transactions"])
+        for kind in ("employee", "vendor"):
+            state.totals[kind].update(data["totals"][kind])
+            state.total_stats[kind] = RunningStats(*data["total_stats"][kind])
+        return state
+
+# -----------------------------
+# 🔎 Online Detector
+# -----------------------------
+
+class OnlineOutlierDetector:
+    """Per-segment and company-wide running baselines with save/restore."""
+
+    def __init__(self, thresholds=THRESHOLDS):
+        self.thresholds = dict(thresholds)
+        self.segments = defaultdict(SegmentState)
+        self.last_id = None            # highest transaction id folded in so far
+
+    def observe(self, department, category, employee, vendor, amount):
+        """
+        Score and fold in one expense. Returns one flag row per scope (segment,
+        company); none for a missing or non-finite amount, which is skipped so
+        it cannot poison the baselines.
+        """
+        if not math.isfinite(amount):
+            return []
+        department, category, employee, vendor = (
+            name if isinstance(name, str) else UNKNOWN for name in (department, category, employee, vendor)
+        )
+        results = []
+        for segment in ((department, category), COMPANY):
+            scores = self.segments[segment].observe(employee, vendor, amount)
+            flags = [kind for kind, z in scores.items() if abs(z) > self.thresholds[kind]]
+            results.append({
+                "department": segment[0],
+                "category": segment[1],
+                "employee": employee,
+                "vendor": vendor,
+                "amount": amount,
+                **{f"{kind}_z": round(z, 4) for kind, z in scores.items()},
+                "flags": flags,
+            })
+        return results
+
+    def observe_frame(self, df):
+        """Observe the rows of an expense frame above the id watermark, in order; returns the flag rows."""
+        if "id" in df:
+            if self.last_id is not None:
+                df = df[df["id"] > self.last_id]
+            if len(df):
+                self.last_id = int(df["id"].max())
+        rows = zip(df["department"], df["category"], df["employee"], df["vendor"], df["amount"])
+        return [result for row in rows for result in self.observe(*row)]
+
+    @classmethod
+    def from_frame(cls, df, thresholds=THRESHOLDS):
+        """Build baselines from existing history in one vectorized pass per scope."""
+        detector = cls(thresholds)
+        if "id" in df and len(df):
+            detector.last_id = int(df["id"].max())
+        # Finite amounts only, as observe() (NaN and ±inf fail the comparison)
+        names = ["department", "category", "employee", "vendor"]
+        df = df[df["amount"].abs() < math.inf]
+        df = df.assign(**{col: df[col].fillna(UNKNOWN) for col in names})
+        scoped = [df, df.assign(department=COMPANY[0], category=COMPANY[1])]
+
+        for frame in scoped:
+            grouped = frame.groupby(["department", "category"])["amount"]
+            txn = grouped.agg(["count", "mean"])
+            txn["m2"] = grouped.var(ddof=0) * txn["count"]
+            for segment, (count, mean, m2) in txn.iterrows():
+                detector.segments[segment].transactions = RunningStats(int(count), mean, m2)
+
+            for kind in ("employee", "vendor"):
+                totals = frame.groupby(["department", "category", kind])["amount"].sum()
+                for (dept, cat), group in totals.groupby(level=[0, 1]):
+                    values = group.to_numpy()
+                    state = detector.segments[(dept, cat)]
+                    state.totals[kind].update(zip(group.index.get_level_values(2), values))
+                    state.total_stats[kind] = RunningStats(
+                        len(values), values.mean(), ((values - values.mean()) ** 2).sum()
+                    )
+        return detector
+
+    def save(self, path=STATE_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "thresholds": self.thresholds,
+            "last_id": self.last_id,
+            # [department, category] lists, as names may contain any character
+            "segments": [[list(key), state.to_dict()] for key, state in self.segments.items()],
+        }
+        path.write_text(json.dumps(data))
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        data = json.loads(Path(path).read_text())
+        detector = cls(data["thresholds"])
+        detector.last_id = data.get("last_id")
+        segments = data["segments"]
+        if isinstance(segments, dict):
+            # State saved before keys were lists: "department|category"
+            segments = [(key.split("|", 1), state) for key, state in segments.items()]
+        for key, state in segments:
+            detector.segments[tuple(key)] = SegmentState.from_dict(state)
+        return detector
+
+
+def load_or_build(path=STATE_PATH, history=None):
+    """Restore saved baselines, or build them from the history file (default: DATA_PATH) on first run."""
+    if Path(path).exists():
+        return OnlineOutlierDetector.load(path)
+    from expense_analysis.loader import DATA_PATH, load_expenses
+    return OnlineOutlierDetector.from_frame(load_expenses(history or DATA_PATH))
+
+# -----------------------------
+# ▶️ Entry Point
+# -----------------------------
+
+if __name__ == "__main__":
+    from expense_analysis.loader import load_expenses
+
+    detector = load_or_build()
+    if len(sys.argv) > 1:
+        for result in detector.observe_frame(load_expenses(sys.argv[1])):
+            if result["flags"]:
+                print(f"🚩 {result['department']} – {result['category']}: "
+                      f"{result['employee']} / {result['vendor']} ${result['amount']:.2f} "
+                      f"-> {', '.join(result['flags'])}")
+    detector.save()
+    print(f"💾 Saved baselines for {len(detector.segments)} segment(s) to {STATE_PATH}")
@@ -0,0 +1,186 @@
+# ============================================================
+# 🗂️ partitions.py
+# ------------------------------------------------------------
+"""
+Hive-partitioned Parquet copy of one expense source, laid out as
+data/.cache/<source>-parts/year=YYYY/month=M/department=D/*.parquet.
+Department, category and date filters given to the scripts become a WHERE
+clause on the `expenses` view: in partitioned mode DuckDB skips every
+directory whose year/month/department cannot match, then prunes row groups
+on category and date statistics, so a one-department, one-quarter question
+reads a few files instead of the whole export. Like the warehouse, the
+dataset is keyed on the source's content hash and rebuilt only when it changes.
+
+Usage (from the project folder):
+    python -m expense_analysis.partitions [path] [--department=Sales] [--from=2025-01-01] [--to=2025-03-31] [--rebuild]
+"""
+
+import json
+import os
+import shutil
+import sys
+from datetime import date
+from pathlib import Path
+
+import duckdb
+
+from expense_analysis.loader import DATA_PATH, cached_table_path, scan_sql, source_fingerprint
+
+REBUILD_FLAG = "--rebuild"
+
+PARTITION_BY = ["year", "month", "department"]
+COLUMNS = ["id", "date", "department", "vendor", "employee", "category", "amount"]
+META_FILE = "_source.json"
+
+# --department=Sales --category=Travel --from=2025-01-01 --to=2025-03-31
+FILTER_FLAGS = {"--department": "department", "--category": "category", "--from": "start", "--to": "end"}
+
+# -----------------------------
+# 🔎 Functions: Filters
+# -----------------------------
+
+def parse_filters(argv):
+    """Filters given as --department=, --category=, --from= and --to= flags."""
+    filters = {}
+    for arg in argv:
+        flag, _, value = arg.partition("=")
+        if flag in FILTER_FLAGS and value:
+            filters[FILTER_FLAGS[flag]] = value
+    return filters
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def filter_sql(filters, partitioned=False):
+    """
+    WHERE clause for department/category/start/end filters (values inlined,
+    since views cannot take parameters). With `partitioned`, date bounds are
+    also stated on the year/month partition columns so whole months are skipped.
+    """
+    filters = filters or {}
+    clauses = [f"{col} = {_literal(filters[col])}" for col in ("department", "category") if filters.get(col)]
+    start, end = (date.fromisoformat(filters[key]) if filters.get(key) else None for key in ("start", "end"))
+    if start:
+        clauses.append(f"date >= DATE {_literal(start)}")
+        if partitioned:
+            clauses.append(f"make_date(year, month, 1) >= DATE {_literal(start.replace(day=1))}")
+    if end:
+        clauses.append(f"date <= DATE {_literal(end)}")
+        if partitioned:
+            clauses.append(f"make_date(year, month, 1) <= DATE {_literal(end)}")
+    return f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+
+def filter_view(con, filters, view="expenses"):
+    """Narrow an existing `view` to the filters with a temp view of the same name."""
+    where = filter_sql(filters)
+    if where:
+        database = con.execute("SELECT current_database()").fetchone()[0]
+        con.execute(f'CREATE OR REPLACE TEMP VIEW {view} AS SELECT * FROM "{database}".main.{view} {where}')
+    return con
+
+# -----------------------------
+# 🏗️ Function: Build Dataset
+# -----------------------------
+
+def dataset_path(path=DATA_PATH):
+    """Dataset directory for a source: data/.cache/<stem>-parts next to its other caches."""
+    path = Path(path)
+    return path.parent / ".cache" / f"{path.stem}-parts"
+
+
+def _built_from(dataset_dir):
+    meta_path = Path(dataset_dir) / META_FILE
+    return json.loads(meta_path.read_text()).get("sha256") if meta_path.exists() else None
+
+
+def build_dataset(path=DATA_PATH, dataset_dir=None, rebuild=False):
+    """
+    Write the source as a year/month/department partitioned Parquet dataset
+    unless it already holds this exact content. Returns (directory, whether it was rebuilt).
+    """
+    dataset_dir = Path(dataset_dir or dataset_path(path))
+    fingerprint = source_fingerprint(path)
+    if not rebuild and _built_from(dataset_dir) == fingerprint:
+        return dataset_dir, False
+
+    # Written next to the old copy and swapped in, so readers never see half a dataset
+    tmp_dir = dataset_dir.with_name(f"{dataset_dir.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.parent.mkdir(parents=True, exist_ok=True)
+    with duckdb.connect() as con:
+        con.execute(f"""
+            COPY (
+                SELECT
+                    id, date, department, vendor, employee, category,
+                    CAST(amount AS DECIMAL(18, 2)) AS amount,
+                    YEAR(date) AS year, MONTH(date) AS month
+                FROM {scan_sql(path)}
+                ORDER BY year, month, department, category, date, id
+            ) TO '{tmp_dir.as_posix()}' (FORMAT PARQUET, PARTITION_BY ({", ".join(PARTITION_BY)}))
+        """)
+    (tmp_dir / META_FILE).write_text(json.dumps({"source": str(path), "sha256": fingerprint}, indent=2))
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    os.replace(tmp_dir, dataset_dir)
+    return dataset_dir, True
+
+
+def dataset_scan_sql(dataset_dir, filename=False):
+    """DuckDB table function reading the partitioned dataset with typed partition columns."""
+    pattern = (Path(dataset_dir) / "**" / "*.parquet").as_posix().replace("'", "''")
+    options = "hive_partitioning = true, hive_types = {'year': INTEGER, 'month': INTEGER}"
+    return f"read_parquet('{pattern}', {options}{', filename = true' if filename else ''})"
+
+# -----------------------------
+# 🔌 Functions: Connect / Read
+# -----------------------------
+
+def connect_partitioned(path=DATA_PATH, filters=None, rebuild=False):
+    """Connection whose `expenses` view reads only the partitions the filters allow."""
+    dataset_dir, _ = build_dataset(path, rebuild=rebuild)
+    con = duckdb.connect()
+    con.execute(f"""
+        CREATE VIEW expenses AS
+        SELECT {", ".join(COLUMNS)}
+        FROM {dataset_scan_sql(dataset_dir)}
+        {filter_sql(filters, partitioned=True)}
+    """)
+    return con
+
+
+def read_filtered(path=DATA_PATH, filters=None, partitioned=False):
+    """
+    Arrow table of the rows matching the filters, in id order, from the
+    partitioned dataset or the source's Parquet cache.
+    """
+    if partitioned:
+        scan = dataset_scan_sql(build_dataset(path)[0])
+    else:
+        scan = scan_sql(cached_table_path(path))
+    with duckdb.connect() as con:
+        return con.execute(f"""
+            SELECT id, date, department, vendor, employee, category, CAST(amount AS DOUBLE) AS amount
+            FROM {scan}
+            {filter_sql(filters, partitioned)}
+            ORDER BY id
+        """).fetch_arrow_table()
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    source = args[0] if args else DATA_PATH
+    filters = parse_filters(sys.argv)
+    dataset_dir, rebuilt = build_dataset(source, rebuild=REBUILD_FLAG in sys.argv)
+    files = list(dataset_dir.rglob("*.parquet"))
+    state = "Built" if rebuilt else "Up to date:"
+    print(f"🗂️ {state} {dataset_dir} ({len(files)} files, {sum(f.stat().st_size for f in files) / 1024 ** 2:.1f} MB)")
+    if filters:
+        with duckdb.connect() as con:
+            read, rows = con.execute(f"""
+                SELECT COUNT(DISTINCT filename), COUNT(*)
+                FROM {dataset_scan_sql(dataset_dir, filename=True)}
+                {filter_sql(filters, partitioned=True)}
+            """).fetchone()
+        print(f"🔎 {filters}: {rows:,} row(s) from {read} of {len(files)} file(s)")
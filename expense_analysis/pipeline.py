@@ -0,0 +1,362 @@
+# ============================================================
+# ⛓️ pipeline.py
+# ------------------------------------------------------------
+"""
+The analyses of scripts 01–07 as one DAG of named stages.
+Each stage declares the stages and config files it reads. The scheduler
+runs independent stages in parallel threads, hands shared upstream results
+(the loaded table, the calendar, the single aggregate scan, the segment
+z-scores) to every stage that needs them in memory, and caches each stage's
+result under data/.cache/pipeline/<source>/. The cache key covers the source's content
+hash, the config files, the code of the modules the stage calls and its
+upstream keys, so a rerun re-executes only the stages whose inputs changed
+and never loads what a cached downstream stage does not need.
+
+Usage (from the project folder):
+    python -m expense_analysis.pipeline [path] [--only STAGE ...] [--rebuild] [--workers N]
+"""
+
+import argparse
+import hashlib
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from expense_analysis import (baselines, calendar_dim, compact, concentration, duplicates, loader, outliers, policy,
+                              runner, segments, tiers)
+from expense_analysis.loader import DATA_PATH, _cache_dir, _remove_stale, source_fingerprint
+from expense_analysis.outliers import zscore
+
+OUTPUT_DIR = Path("outputs/pipeline")
+SOURCE = "<source>"          # stands for the expense file in a stage's `files`
+
+
+class Stage:
+    """One named step: a function of its input stages' results."""
+
+    def __init__(self, func, inputs=(), files=(), modules=(), persist=True):
+        self.func = func
+        self.inputs = list(inputs)
+        self.files = list(files)          # config files (or SOURCE) whose contents it reads
+        self.modules = list(modules)      # modules whose code it runs
+        self.persist = persist            # False: memory only (connections, cheap loads)
+
+# -----------------------------
+# 🧱 Stages: Shared Inputs
+# -----------------------------
+
+def load_stage(path):
+    """The compact transaction table, loaded once for every stage."""
+    return compact.load_compact(path)
+
+
+def calendar_stage(expenses):
+    """The calendar dimension (weekday, weekend, holiday, month per day), covering every transaction."""
+    return calendar_dim.default_calendar(expenses.years())
+
+
+def database_stage(expenses, calendar):
+    """
+    In-memory DuckDB database with `expenses` and `calendar` tables. Frames
+    registered on a connection are invisible to its cursors, so both are
+    materialized once; each stage then queries through its own cursor.
+    """
+    con = expenses.register(duckdb.connect(), view="compact_expenses")
+    calendar_dim.register_calendar(con, calendar, name="calendar_frame")
+    con.execute("CREATE TABLE expenses AS SELECT * FROM compact_expenses")
+    con.execute("CREATE TABLE calendar AS SELECT * FROM calendar_frame")
+    return con
+
+
+def aggregates_stage(database):
+    """Every group-by the reports need, in one GROUPING SETS scan."""
+    with database.cursor() as con:
+        return runner.compute_aggregates(con)
+
+
+def segment_outliers_stage(database):
+    """Employee, vendor and transaction z-scores for every department–category segment."""
+    with database.cursor() as con:
+        return segments.segment_outliers(con)
+
+# -----------------------------
+# 📊 Stages: Reports (01–07)
+# -----------------------------
+
+def category_share_stage(aggregates):
+    return runner.category_share(aggregates)
+
+
+def benchmark_tiers_stage(database):
+    with database.cursor() as con:
+        return tiers.tier_comparison(con, "all", tiers.load_expected_tiers())
+
+
+def sales_office_supplies_stage(expenses, calendar):
+    """02: employee/vendor totals, monthly trend and flagged transactions for one segment."""
+    rows = expenses.where(department="Sales", category="Office Supplies")
+    sales_os = expenses.decode(rows)
+    day = expenses.day[rows]
+    sales_os["month"] = calendar_dim.lookup(calendar, day, "month")
+    sales_os["weekend"] = calendar_dim.lookup(calendar, day, "is_weekend")
+    sales_os["holiday"] = calendar_dim.lookup(calendar, day, "is_holiday")
+    sales_os["z_score"] = zscore(sales_os["amount"])
+
+    report = {}
+    for by in ("employee", "vendor"):
+        totals = sales_os.groupby(by)["amount"].sum().reset_index()
+        totals["z_score"] = zscore(totals["amount"])
+        totals["is_outlier"] = totals["z_score"].abs() > segments.THRESHOLDS[by]
+        report[by] = totals.sort_values("amount", ascending=False, ignore_index=True)
+    report["monthly"] = sales_os.groupby("month")["amount"].sum().reset_index()
+    flagged = (sales_os["z_score"].abs() > segments.THRESHOLDS["transaction"]) | sales_os["weekend"] | sales_os["holiday"]
+    report["transactions"] = sales_os[flagged].sort_values("date", ignore_index=True)
+    return report
+
+
+def monthly_spend_stage(aggregates):
+    return runner.monthly_spend(aggregates)
+
+
+def policy_violations_stage(database):
+    with database.cursor() as con:
+        return policy.evaluate_policies(con, policy.load_rules())
+
+
+def sales_check_stage(segment_outliers):
+    """05: the Sales slices of the all-segment scores."""
+    return {kind: frame[frame["department"] == "Sales"].reset_index(drop=True)
+            for kind, frame in segment_outliers.items()}
+
+
+def same_day_repeats_stage(aggregates):
+    return runner.same_day_repeats(aggregates)
+
+
+def vendor_summary_stage(aggregates):
+    return runner.vendor_summary(aggregates)
+
+
+def vendor_concentration_stage(database):
+    with database.cursor() as con:
+        return concentration.concentration_trend(concentration.rolling_concentration(con))
+
+
+def baseline_alerts_stage(database):
+    """Purchases far above the employee's own rolling baselines in that category."""
+    with database.cursor() as con:
+        return baselines.baseline_alerts(baselines.transaction_baselines(con))
+
+
+def duplicates_stage(database):
+    with database.cursor() as con:
+        return {"near_duplicates": duplicates.near_duplicates(con),
+                "split_purchases": duplicates.split_purchases(con, policy.load_rules())}
+
+# -----------------------------
+# 🗺️ Stage Graph
+# -----------------------------
+# name -> Stage. A stage's function receives its inputs' results by name.
+STAGES = {
+    "expenses": Stage(load_stage, files=[SOURCE], modules=[loader, compact], persist=False),
+    "calendar": Stage(calendar_stage, ["expenses"], [calendar_dim.HOLIDAYS_PATH], [calendar_dim], persist=False),
+    "database": Stage(database_stage, ["expenses", "calendar"], persist=False),
+    "aggregates": Stage(aggregates_stage, ["database"], modules=[runner]),
+    "segment_outliers": Stage(segment_outliers_stage, ["database"], modules=[segments]),                    # 02, 05
+    "category_share": Stage(category_share_stage, ["aggregates"], modules=[runner]),                        # 01
+    "benchmark_tiers": Stage(benchmark_tiers_stage, ["database"], [tiers.TIERS_PATH], [tiers]),             # 01
+    "sales_office_supplies": Stage(sales_office_supplies_stage, ["expenses", "calendar"],                   # 02
+                                   modules=[outliers, segments]),
+    "monthly_spend": Stage(monthly_spend_stage, ["aggregates"], modules=[runner]),                          # 03
+    "policy_violations": Stage(policy_violations_stage, ["database"], [policy.RULES_PATH], [policy]),       # 04
+    "sales_check": Stage(sales_check_stage, ["segment_outliers"]),                                          # 05
+    "same_day_repeats": Stage(same_day_repeats_stage, ["aggregates"], modules=[runner]),                    # 06
+    "vendor_summary": Stage(vendor_summary_stage, ["aggregates"], modules=[runner]),                        # 07
+    "vendor_concentration": Stage(vendor_concentration_stage, ["database"], modules=[concentration]),       # 07
+    "duplicates": Stage(duplicates_stage, ["database"], [policy.RULES_PATH], [duplicates, policy]),
+    "baseline_alerts": Stage(baseline_alerts_stage, ["database"], modules=[baselines]),
+}
+
+# The stages whose results are written out; the rest feed them
+REPORTS = [
+    "category_share", "benchmark_tiers", "sales_office_supplies", "monthly_spend", "policy_violations",
+    "sales_check", "same_day_repeats", "vendor_summary", "vendor_concentration", "duplicates", "baseline_alerts",
+]
+
+# -----------------------------
+# 🔑 Functions: Order and Keys
+# -----------------------------
+
+def topological_order(stages=STAGES):
+    """Stage names with every stage after its inputs; raises ValueError on a cycle."""
+    order, state = [], {}
+
+    def visit(name, path=()):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Stage cycle: {' → '.join([*path, name])}")
+        if name not in stages:
+            raise ValueError(f"Unknown stage {name!r}" + (f" (input of {path[-1]})" if path else ""))
+        state[name] = "visiting"
+        for upstream in stages[name].inputs:
+            visit(upstream, (*path, name))
+        state[name] = "done"
+        order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+
+_digests = {}
+
+
+def _file_digest(path):
+    # Content hash per file, memoized until the file's size or mtime changes
+    stat = os.stat(path)
+    memo = (str(path), stat.st_size, stat.st_mtime_ns)
+    if memo not in _digests:
+        _digests[memo] = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    return _digests[memo]
+
+
+def stage_keys(path=DATA_PATH, stages=STAGES):
+    """Cache key per stage from its files, its code and its inputs' keys (no stage is run)."""
+    keys = {}
+    for name in topological_order(stages):
+        stage = stages[name]
+        digest = hashlib.sha256(name.encode())
+        for module in [sys.modules[__name__], *stage.modules]:
+            digest.update(_file_digest(module.__file__).encode())
+        for file in stage.files:
+            digest.update((source_fingerprint(path) if file == SOURCE else _file_digest(file)).encode())
+        for upstream in stage.inputs:
+            digest.update(keys[upstream].encode())
+        keys[name] = digest.hexdigest()
+    return keys
+
+# -----------------------------
+# 🚀 Function: Run Pipeline
+# -----------------------------
+
+def source_cache_dir(path=DATA_PATH):
+    """Stage results of one source: data/.cache/pipeline/<stem>/ next to its other caches."""
+    return _cache_dir(path) / "pipeline" / Path(path).stem
+
+
+def _cache_path(name, key, cache_dir):
+    return Path(cache_dir) / f"{name}-{key[:16]}.pkl"
+
+
+def plan(targets, keys, cache_dir, stages=STAGES, rebuild=False):
+    """name -> "run" or "load": cached stages are loaded and their own inputs skipped."""
+    actions = {}
+
+    def need(name):
+        if name in actions:
+            return
+        if stages[name].persist and not rebuild and _cache_path(name, keys[name], cache_dir).exists():
+            actions[name] = "load"
+            return
+        actions[name] = "run"
+        for upstream in stages[name].inputs:
+            need(upstream)
+
+    for name in targets:
+        need(name)
+    return actions
+
+
+def _execute(name, action, stage, key, inputs, cache_dir):
+    start = time.perf_counter()
+    path = _cache_path(name, key, cache_dir)
+    if action == "load":
+        result = pickle.loads(path.read_bytes())
+    else:
+        result = stage.func(**inputs)
+        if stage.persist:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _remove_stale(path.parent, name, ".pkl", keep=path)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+            os.replace(tmp_path, path)
+    return result, time.perf_counter() - start
+
+
+def run_pipeline(path=DATA_PATH, targets=REPORTS, workers=None, rebuild=False,
+                 stages=STAGES, cache_dir=None):
+    """
+    Run (or load) what the target stages need, independent stages in
+    parallel. Returns ({target: result}, {stage: (action, seconds)}).
+    """
+    keys = stage_keys(path, stages)
+    cache_dir = cache_dir or source_cache_dir(path)
+    actions = plan(targets, keys, cache_dir, stages, rebuild)
+    results, timings, running = {}, {}, {}
+
+    def ready(name):
+        return actions[name] == "load" or all(upstream in results for upstream in stages[name].inputs)
+
+    # The path is an implicit input of the loading stages
+    source = {"path": path}
+    with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+        waiting = [name for name in topological_order(stages) if name in actions]
+        while waiting or running:
+            for name in [name for name in waiting if ready(name)]:
+                waiting.remove(name)
+                stage = stages[name]
+                inputs = {} if actions[name] == "load" else (
+                    {upstream: results[upstream] for upstream in stage.inputs} if stage.inputs else source)
+                running[pool.submit(_execute, name, actions[name], stage, keys[name], inputs, cache_dir)] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name], seconds = future.result()
+                timings[name] = (actions[name], seconds)
+
+    if isinstance(results.get("database"), duckdb.DuckDBPyConnection):
+        results["database"].close()
+    return {name: results[name] for name in targets}, timings
+
+
+def write_reports(results, output_dir=OUTPUT_DIR):
+    """One CSV per report table (a report returning several tables writes name-part.csv)."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    written = 0
+    for name, result in results.items():
+        tables = result.items() if isinstance(result, dict) else [(None, result)]
+        for part, frame in tables:
+            if isinstance(frame, pd.DataFrame):
+                frame.to_csv(output_dir / (f"{name}-{part}.csv" if part else f"{name}.csv"), index=False)
+                written += 1
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the analysis suite as a DAG of cached stages.")
+    parser.add_argument("source", nargs="?", default=DATA_PATH, help="expense CSV/Parquet file")
+    parser.add_argument("--only", nargs="+", choices=list(STAGES), help="stages to produce (default: every report)")
+    parser.add_argument("--rebuild", action="store_true", help="ignore cached stage results")
+    parser.add_argument("--workers", type=int, default=None, help="threads for independent stages")
+    parser.add_argument("--out", default=OUTPUT_DIR, help="directory for report CSVs")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results, timings = run_pipeline(args.source, args.only or REPORTS, args.workers, args.rebuild)
+    wall = time.perf_counter() - start
+
+    ran = sum(action == "run" for action, _ in timings.values())
+    print(f"⛓️ {len(timings)} stage(s): {ran} ran, {len(timings) - ran} loaded from cache, {wall:.2f}s wall")
+    for name in topological_order():
+        if name in timings:
+            action, seconds = timings[name]
+            print(f"   {name:<24} {action:<5} {seconds:.3f}s")
+    print(f"💾 Wrote {write_reports(results, args.out)} table(s) to {args.out}/")
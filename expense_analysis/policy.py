@@ -0,0 +1,81 @@
+# ============================================================
+# 🚨 policy.py
+# ------------------------------------------------------------
+"""
+Declarative expense-policy engine.
+Rules live in a table (config/policy_rules.csv): category, limit, scope and
+optional department/employee filters for per-entity limits. Rules are
+grouped by scope and every rule of a scope is checked in one SQL statement,
+so adding a rule adds a row to a join instead of another scan.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+RULES_PATH = Path("config/policy_rules.csv")
+
+# Scope -> columns that define one "unit" the limit applies to.
+SCOPES = {
+    "transaction": ["id", "date", "department", "vendor", "employee"],
+    "employee_day": ["employee", "date"],
+    "employee_course": ["employee", "vendor", "date"],  # one provider, one day = one course
+    "month": ["month"],
+}
+
+VIOLATION_COLUMNS = [
+    "rule_id", "scope", "category", "id", "date", "month", "department",
+    "vendor", "employee", "amount", "max_amount", "txn_count",
+]
+
+# -----------------------------
+# 📋 Function: Load Rules
+# -----------------------------
+
+def load_rules(path=RULES_PATH):
+    """Read the policy rule table and validate its scopes."""
+    rules = pd.read_csv(path, dtype={"department": "string", "employee": "string"})
+    unknown = set(rules["scope"]) - set(SCOPES)
+    if unknown:
+        raise ValueError(f"Unknown policy scope(s): {', '.join(sorted(unknown))}")
+    return rules
+
+# -----------------------------
+# 🔍 Function: Evaluate Rules
+# -----------------------------
+
+def _scope_query(scope):
+    keys = SCOPES[scope]
+    group_keys = ", ".join(f"u.{key}" for key in keys)
+    return f"""
+        SELECT
+            r.rule_id, r.scope, r.category, r.max_amount,
+            {group_keys},
+            SUM(u.amount) AS amount,
+            COUNT(*) AS txn_count
+        FROM (SELECT *, DATE_TRUNC('month', date) AS month FROM expenses) u
+        JOIN policy_rules r
+          ON r.scope = '{scope}'
+         AND u.category = r.category
+         AND (r.department IS NULL OR u.department = r.department)
+         AND (r.employee IS NULL OR u.employee = r.employee)
+        GROUP BY r.rule_id, r.scope, r.category, r.max_amount, {group_keys}
+        HAVING SUM(u.amount) > r.max_amount
+    """
+
+
+def evaluate_policies(con, rules):
+    """
+    Check every rule against the `expenses` view on a DuckDB connection.
+    Returns one violations table; columns outside a rule's scope are empty.
+    """
+    con.register("policy_rules", rules)
+    results = [con.execute(_scope_query(scope)).df() for scope in rules["scope"].unique()]
+    con.unregister("policy_rules")
+
+    results = [result for result in results if not result.empty]
+    if not results:
+        return pd.DataFrame(columns=VIOLATION_COLUMNS)
+    violations = pd.concat(results, ignore_index=True).reindex(columns=VIOLATION_COLUMNS)
+    violations["id"] = violations["id"].astype("Int64")
+    return violations.sort_values(["rule_id", "date", "month", "id"]).reset_index(drop=True)
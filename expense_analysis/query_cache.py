@@ -0,0 +1,230 @@
+# ============================================================
+# 🗃️ query_cache.py
+# ------------------------------------------------------------
+"""
+Result cache for the scripts' DuckDB queries.
+A SELECT's result is keyed on its normalized SQL text, its parameters, a
+fingerprint of the source data (content hashes) and of any frames registered
+on the connection. Results live in an in-memory LRU and as Parquet files on
+disk, each bounded in bytes with least-recently-used eviction, so re-running
+a query against an unchanged snapshot skips DuckDB entirely.
+
+Usage (from the project folder):
+    python -m expense_analysis.query_cache [--clear]
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from expense_analysis.loader import source_fingerprint
+
+CACHE_DIR = Path("data/.cache/queries")
+MAX_MEMORY_BYTES = 256 * 1024 ** 2
+MAX_DISK_BYTES = 2 * 1024 ** 3
+
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_QUERY_START = re.compile(r"^\s*(\(\s*)*(SELECT|WITH|FROM|VALUES|TABLE|DESCRIBE|SUMMARIZE)\b", re.IGNORECASE)
+
+# -----------------------------
+# 🔑 Functions: Keys
+# -----------------------------
+
+def normalize_sql(sql):
+    """Collapse whitespace outside quoted strings/identifiers and drop trailing semicolons."""
+    parts = _QUOTED.split(sql)
+    parts[::2] = [re.sub(r"\s+", " ", part) for part in parts[::2]]
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def data_fingerprint(path):
+    """Content fingerprint of a source file or glob (every matching file's hash)."""
+    paths = sorted(glob.glob(str(path))) or [str(path)]
+    digest = hashlib.sha256()
+    for match in paths:
+        digest.update(f"{match}:{source_fingerprint(match)}".encode())
+    return digest.hexdigest()
+
+
+def frame_fingerprint(frame):
+    """Hash of a registered DataFrame's columns, dtypes and values."""
+    digest = hashlib.sha256(repr(list(zip(frame.columns, map(str, frame.dtypes)))).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+# -----------------------------
+# 🗃️ Class: Query Cache
+# -----------------------------
+
+class QueryCache:
+    """Two-level (memory, Parquet on disk) LRU cache of query result frames."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_memory_bytes=MAX_MEMORY_BYTES, max_disk_bytes=MAX_DISK_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()      # key -> (frame, nbytes)
+        self.memory_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key(sql, parameters, fingerprint):
+        payload = json.dumps([normalize_sql(sql), parameters, fingerprint], default=repr)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        """Cached frame for key (a copy), or None on a miss."""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return self.memory[key][0].copy()
+
+        path = self.cache_dir / f"{key}.parquet"
+        if path.exists():
+            frame = pd.read_parquet(path)
+            os.utime(path)                       # mtime is the disk LRU clock
+            self.stats["disk_hits"] += 1
+            self._remember(key, frame)
+            return frame.copy()
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, frame):
+        """Store a result in memory and on disk, evicting least-recently-used entries."""
+        self._remember(key, frame.copy())
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{key}.parquet"
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            frame.to_parquet(tmp_path, index=False)
+        except (ValueError, TypeError, ImportError):
+            # Column types Parquet cannot hold stay memory-only
+            tmp_path.unlink(missing_ok=True)
+            return
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _remember(self, key, frame):
+        nbytes = int(frame.memory_usage(deep=True, index=False).sum())
+        if nbytes > self.max_memory_bytes:
+            return
+        if key in self.memory:
+            self.memory_bytes -= self.memory.pop(key)[1]
+        self.memory[key] = (frame, nbytes)
+        self.memory_bytes += nbytes
+        while self.memory_bytes > self.max_memory_bytes:
+            _, (_, evicted) = self.memory.popitem(last=False)
+            self.memory_bytes -= evicted
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self):
+        entries = sorted(((p.stat().st_mtime, p.stat().st_size, p) for p in self.cache_dir.glob("*.parquet")),
+                         key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.stats["evictions"] += 1
+
+    def summary(self):
+        """One-line hit/miss report."""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        rate = f"{100 * hits / total:.0f}%" if total else "n/a"
+        return (f"🗃️ Query cache: {hits} hit(s) ({self.stats['memory_hits']} memory, "
+                f"{self.stats['disk_hits']} disk), {self.stats['misses']} miss(es), "
+                f"hit rate {rate}, {len(self.memory)} in memory ({self.memory_bytes / 1024 ** 2:.1f} MB)")
+
+# -----------------------------
+# 🔌 Class: Cached Connection
+# -----------------------------
+
+class CachedQuery:
+    """Deferred SELECT: .df() goes through the cache, anything else runs the query."""
+
+    def __init__(self, owner, sql, parameters):
+        self.owner = owner
+        self.sql = sql
+        self.parameters = parameters
+
+    def df(self):
+        owner = self.owner
+        key = owner.cache.key(self.sql, self.parameters, owner.fingerprint())
+        frame = owner.cache.get(key)
+        if frame is None:
+            frame = owner.run(self.sql, self.parameters).df()
+            owner.cache.put(key, frame)
+        return frame
+
+    fetchdf = df
+
+    def __getattr__(self, name):
+        return getattr(self.owner.run(self.sql, self.parameters), name)
+
+
+class CachedConnection:
+    """Wraps a DuckDB connection so SELECT results are served from a QueryCache."""
+
+    def __init__(self, con, data_key, cache=None):
+        self.con = con
+        self.cache = cache or QueryCache()
+        self.data_key = data_key
+        self.registered = {}
+        self.statements = hashlib.sha256()      # DDL/DML run since wrapping
+
+    def fingerprint(self):
+        return [self.data_key, sorted(self.registered.items()), self.statements.hexdigest()]
+
+    def run(self, sql, parameters=None):
+        return self.con.execute(sql, parameters) if parameters is not None else self.con.execute(sql)
+
+    def execute(self, sql, parameters=None):
+        if _QUERY_START.match(sql):
+            return CachedQuery(self, sql, parameters)
+        # Anything else may change what later queries see, so it joins the key
+        self.statements.update(json.dumps([normalize_sql(sql), parameters], default=repr).encode())
+        self.run(sql, parameters)
+        return self
+
+    def register(self, name, frame):
+        self.registered[name] = frame_fingerprint(frame)
+        self.con.register(name, frame)
+        return self
+
+    def unregister(self, name):
+        self.registered.pop(name, None)
+        self.con.unregister(name)
+        return self
+
+    def close(self):
+        self.con.close()
+
+    def __getattr__(self, name):
+        return getattr(self.con, name)
+
+
+def cached_connection(con, path, mode, cache=None, filters=None):
+    """Wrap a connection to the `expenses` data of `path` (opened in `mode`, narrowed by `filters`) with the query cache."""
+    return CachedConnection(con, [mode, data_fingerprint(path), sorted((filters or {}).items())], cache)
+
+
+if __name__ == "__main__":
+    entries = list(CACHE_DIR.glob("*.parquet"))
+    if "--clear" in sys.argv:
+        for entry in entries:
+            entry.unlink()
+        print(f"🧹 Removed {len(entries)} cached result(s) from {CACHE_DIR}/")
+    else:
+        size = sum(entry.stat().st_size for entry in entries)
+        print(f"🗃️ {len(entries)} cached result(s) in {CACHE_DIR}/ ({size / 1024 ** 2:.1f} MB "
+              f"of {MAX_DISK_BYTES / 1024 ** 3:.0f} GB)")
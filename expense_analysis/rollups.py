@@ -0,0 +1,159 @@
+# ============================================================
+# 📅 rollups.py
+# ------------------------------------------------------------
+"""
+Persistent month × department × category × vendor rollup with an `id`
+high-water mark, one database per source (data/.cache/<source>.rollups.duckdb). New exports only ever append rows with higher ids, so each
+refresh folds in just those rows; period questions (monthly trend,
+quarterly totals, ...) are answered from the rollup instead of raw history.
+"""
+
+from pathlib import Path
+
+import duckdb
+
+from expense_analysis.loader import DATA_PATH, _cache_dir, scan_sql
+
+REBUILD_FLAG = "--rebuild"
+
+# -----------------------------
+# 🗄️ Function: Open Rollup Store
+# -----------------------------
+
+def rollup_path(path=DATA_PATH):
+    """Rollup database for a source: data/.cache/<stem>.rollups.duckdb next to its other caches."""
+    return _cache_dir(path) / f"{Path(path).stem}.rollups.duckdb"
+
+
+def connect_rollups(db_path=None):
+    """Open (and if needed create) the persistent rollup database (default: the default source's)."""
+    db_path = Path(db_path or rollup_path())
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    con = duckdb.connect(str(db_path))
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_rollup (
+            month DATE NOT NULL,
+            department VARCHAR NOT NULL,
+            category VARCHAR NOT NULL,
+            vendor VARCHAR NOT NULL,
+            total_spend DOUBLE NOT NULL,
+            txn_count BIGINT NOT NULL,
+            PRIMARY KEY (month, department, category, vendor)
+        )
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_watermark (
+            source VARCHAR PRIMARY KEY,
+            max_id BIGINT NOT NULL
+        )
+    """)
+    return con
+
+# -----------------------------
+# 🔄 Function: Refresh Rollup
+# -----------------------------
+
+def refresh_rollup(path=DATA_PATH, db_path=None, rebuild=False):
+    """
+    Fold rows with id above the stored watermark into the source's rollup
+    (so two sources never share totals). Returns the open rollup connection
+    and the number of new rows folded in.
+    """
+    con = connect_rollups(db_path or rollup_path(path))
+    source = Path(path).as_posix()
+
+    # All or nothing: a failed refresh (or rebuild) leaves the rollup and watermark as they were
+    con.execute("BEGIN TRANSACTION")
+    try:
+        if rebuild:
+            con.execute("DELETE FROM monthly_rollup")
+            con.execute("DELETE FROM rollup_watermark")
+
+        row = con.execute("SELECT max_id FROM rollup_watermark WHERE source = ?", [source]).fetchone()
+        watermark = row[0] if row else -1
+
+        con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE new_rows AS
+            SELECT id, date, department, category, vendor, amount
+            FROM {scan_sql(path)}
+            WHERE id > ?
+        """, [watermark])
+        new_count = con.execute("SELECT COUNT(*) FROM new_rows").fetchone()[0]
+
+        if new_count:
+            con.execute("""
+                INSERT INTO monthly_rollup
+                SELECT
+                    DATE_TRUNC('month', date) AS month,
+                    COALESCE(department, 'Unknown'),
+                    COALESCE(category, 'Unknown'),
+                    COALESCE(vendor, 'Unknown'),
+                    COALESCE(SUM(amount), 0),
+                    COUNT(*)
+                FROM new_rows
+                WHERE date IS NOT NULL
+                GROUP BY ALL
+                ON CONFLICT DO UPDATE SET
+                    total_spend = total_spend + EXCLUDED.total_spend,
+                    txn_count = txn_count + EXCLUDED.txn_count
+            """)
+            con.execute("""
+                INSERT OR REPLACE INTO rollup_watermark
+                SELECT ?, MAX(id) FROM new_rows
+            """, [source])
+        con.execute("DROP TABLE new_rows")
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    return con, new_count
+
+# -----------------------------
+# 📊 Functions: Period Queries
+# -----------------------------
+
+def _filters(department, category, start=None, end=None):
+    clauses, params = [], []
+    if department is not None:
+        clauses.append("department = ?")
+        params.append(department)
+    if category is not None:
+        clauses.append("category = ?")
+        params.append(category)
+    # The rollup is monthly, so a date range keeps the months it overlaps
+    if start is not None:
+        clauses.append("month >= DATE_TRUNC('month', CAST(? AS DATE))")
+        params.append(start)
+    if end is not None:
+        clauses.append("month <= CAST(? AS DATE)")
+        params.append(end)
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+
+def period_spend(con, period="month", by=(), department=None, category=None, start=None, end=None):
+    """
+    Total spend per period ('month', 'quarter' or 'year') from the rollup,
+    optionally split by rollup dimensions and filtered to one segment and
+    the months overlapping start..end.
+    """
+    if period not in ("month", "quarter", "year"):
+        raise ValueError(f"Unsupported period: {period}")
+    where, params = _filters(department, category, start, end)
+    keys = ", ".join(["period", *by])
+    return con.execute(f"""
+        SELECT
+            DATE_TRUNC('{period}', month) AS period,
+            {"".join(f"{col}, " for col in by)}
+            SUM(total_spend) AS total_spend,
+            SUM(txn_count)::BIGINT AS txn_count
+        FROM monthly_rollup
+        {where}
+        GROUP BY {keys}
+        ORDER BY {keys}
+    """, params).df()
+
+
+def monthly_trend(con, department=None, category=None, start=None, end=None):
+    """Monthly total spend, company-wide or for one department/category, optionally within start..end."""
+    trend = period_spend(con, "month", department=department, category=category, start=start, end=end)
+    return trend.rename(columns={"period": "month"})[["month", "total_spend"]]
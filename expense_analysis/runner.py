@@ -0,0 +1,166 @@
+# ============================================================
+# 🏃 runner.py
+# ------------------------------------------------------------
+"""
+Runs the aggregates behind scripts 01–07 as one DuckDB scan.
+Every group-by the scripts need is planned as a GROUPING SET, so the
+expense table is read once; each analysis then reads its own slice.
+
+Usage (from the project folder):
+    python -m expense_analysis.runner [path/to/expenses.csv] [--stream | --warehouse | --partitioned] [--cache]
+"""
+
+import sys
+
+from expense_analysis.loader import DATA_PATH, connect_expenses, connect_options
+from expense_analysis.outliers import zscore
+
+# -----------------------------
+# 🗺️ Aggregate Plan
+# -----------------------------
+# name -> grouping columns. Adding an analysis only means adding its grouping here.
+AGGREGATES = {
+    "department": ("department",),                                  # 01
+    "department_category": ("department", "category"),              # 01
+    "segment_employee": ("department", "category", "employee"),     # 02, 05
+    "segment_vendor": ("department", "category", "vendor"),         # 02, 05
+    "segment_month": ("department", "category", "month"),           # 02
+    "month": ("month",),                                            # 03
+    "employee_vendor_date": ("employee", "vendor", "date"),         # 06
+    "vendor": ("vendor",),                                          # 07
+}
+
+GROUP_COLUMNS = ["department", "category", "employee", "vendor", "month", "date"]
+
+
+def _grouping_id(columns):
+    """GROUPING() bitmask for a set: a bit is 1 when that column is rolled up."""
+    bits = ["0" if col in columns else "1" for col in GROUP_COLUMNS]
+    return int("".join(bits), 2)
+
+
+def build_query(aggregates=AGGREGATES, table="expenses"):
+    """Build one GROUPING SETS query covering every planned aggregate."""
+    sets = ",\n            ".join(f"({', '.join(cols)})" for cols in aggregates.values())
+    return f"""
+        SELECT
+            {', '.join(GROUP_COLUMNS)},
+            GROUPING({', '.join(GROUP_COLUMNS)}) AS grouping_id,
+            SUM(amount) AS total_spend,
+            COUNT(*) AS txn_count
+        FROM (
+            SELECT
+                department, category, employee,
+                COALESCE(vendor, 'Unknown') AS vendor,
+                DATE_TRUNC('month', date) AS month,
+                date, amount
+            FROM {table}
+        )
+        GROUP BY GROUPING SETS (
+            {sets}
+        )
+    """
+
+# -----------------------------
+# 📦 Shared Aggregates
+# -----------------------------
+
+class SharedAggregates:
+    """Result of the single scan, sliced per planned aggregate."""
+
+    def __init__(self, cube, aggregates=AGGREGATES):
+        self.cube = cube
+        self.aggregates = aggregates
+
+    def slice(self, name):
+        """Return one aggregate as a plain DataFrame with only its grouping columns."""
+        columns = list(self.aggregates[name])
+        rows = self.cube[self.cube["grouping_id"] == _grouping_id(columns)]
+        return rows[columns + ["total_spend", "txn_count"]].reset_index(drop=True)
+
+
+def compute_aggregates(con, aggregates=AGGREGATES):
+    """Scan the `expenses` view once and return every planned aggregate."""
+    cube = con.execute(build_query(aggregates)).df()
+    return SharedAggregates(cube, aggregates)
+
+# -----------------------------
+# 📊 Analyses (read from slices)
+# -----------------------------
+
+def category_share(aggs):
+    """01: % of each department's spend that goes to each category."""
+    dept = aggs.slice("department").rename(columns={"total_spend": "dept_total"})
+    cat = aggs.slice("department_category")
+    share = cat.merge(dept[["department", "dept_total"]], on="department")
+    share["percent_of_dept_spend"] = (100.0 * share["total_spend"] / share["dept_total"]).round(2)
+    share = share.sort_values(["department", "category"]).reset_index(drop=True)
+    return share[["department", "category", "percent_of_dept_spend"]]
+
+
+def segment_spend(aggs, department, category, by="employee"):
+    """02/05: employee or vendor totals within one department–category segment, with z-scores."""
+    rows = aggs.slice(f"segment_{by}")
+    rows = rows[(rows["department"] == department) & (rows["category"] == category)]
+    rows = rows[[by, "total_spend", "txn_count"]].reset_index(drop=True)
+    rows["z_score"] = zscore(rows["total_spend"]) if len(rows) > 1 else 0.0
+    return rows.sort_values("total_spend", ascending=False)
+
+
+def monthly_spend(aggs, department=None, category=None):
+    """03 (company-wide) or 02 (one segment): spend by month."""
+    if department is None:
+        rows = aggs.slice("month")
+    else:
+        rows = aggs.slice("segment_month")
+        rows = rows[(rows["department"] == department) & (rows["category"] == category)]
+    return rows[["month", "total_spend"]].sort_values("month").reset_index(drop=True)
+
+
+def same_day_repeats(aggs):
+    """06: employees buying from the same vendor more than once on one day."""
+    rows = aggs.slice("employee_vendor_date")
+    rows = rows[rows["txn_count"] > 1].rename(columns={"total_spend": "total_amount"})
+    rows = rows[["employee", "vendor", "date", "txn_count", "total_amount"]]
+    return rows.sort_values(["txn_count", "total_amount"], ascending=False).reset_index(drop=True)
+
+
+def vendor_summary(aggs):
+    """07: company-wide vendor spend share, z-score and risk flag."""
+    rows = aggs.slice("vendor").sort_values("total_spend", ascending=False).reset_index(drop=True)
+    rows["percent_of_total"] = rows["total_spend"] / rows["total_spend"].sum() * 100
+    rows["z_score"] = zscore(rows["total_spend"])
+    rows["Flag"] = "OK"
+    rows.loc[rows["txn_count"] == 1, "Flag"] = "Single-Use Vendor"
+    rows.loc[rows["z_score"] > 1.96, "Flag"] = "Z Outlier"
+    rows.loc[rows["percent_of_total"] >= 30, "Flag"] = "Hard High"
+    rows["percent_of_total"] = rows["percent_of_total"].round(2)
+    return rows
+
+# -----------------------------
+# ▶️ Entry Point
+# -----------------------------
+
+def run(path=DATA_PATH, streaming=False, warehouse=False, cache=None, partitioned=False, filters=None):
+    """Compute every aggregate in one scan and print each analysis."""
+    aggs = compute_aggregates(connect_expenses(path, streaming=streaming, warehouse=warehouse, cache=cache,
+                                               partitioned=partitioned, filters=filters))
+
+    print("📊 % of Department Spend by Category:")
+    print(category_share(aggs))
+    print("\n👤 Sales – Office Supplies Employee Spend:")
+    print(segment_spend(aggs, "Sales", "Office Supplies", by="employee"))
+    print("\n🏪 Sales – Office Supplies Vendor Spend:")
+    print(segment_spend(aggs, "Sales", "Office Supplies", by="vendor"))
+    print("\n📅 Company-Wide Monthly Spend:")
+    print(monthly_spend(aggs))
+    print("\n🔁 Same-Day Vendor Usage by Employee:")
+    print(same_day_repeats(aggs))
+    print("\n🏪 Vendor Concentration Check — Company-Wide:")
+    print(vendor_summary(aggs))
+    return aggs
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    run(args[0] if args else DATA_PATH, **connect_options(sys.argv))
@@ -0,0 +1,115 @@
+# ============================================================
+# 🧩 segments.py
+# ------------------------------------------------------------
+"""
+Runs the Sales – Office Supplies style checks for every department–category
+segment at once: employee-, vendor- and transaction-level z-scores,
+weekend flags and missing-category checks. Statistics come from window
+functions partitioned by segment, so the data is scanned once per check
+rather than once per segment.
+
+Usage (from the project folder):
+    python -m expense_analysis.segments [--stream | --warehouse | --partitioned] [--cache]
+"""
+
+import sys
+
+from expense_analysis.loader import connect_expenses, connect_options
+
+SEGMENT = ["department", "category"]
+
+# Same cut-offs as 02_sales_office_supplies.py
+THRESHOLDS = {"employee": 1.0, "vendor": 1.5, "transaction": 1.5}
+
+# -----------------------------
+# 👤 Employee / Vendor Z-Scores
+# -----------------------------
+
+def entity_scores(con, by):
+    """Total spend per segment × employee (or vendor), z-scored within each segment."""
+    return con.execute(f"""
+        WITH totals AS (
+            SELECT department, category, COALESCE({by}, 'Unknown') AS {by},
+                   SUM(amount) AS amount, COUNT(*) AS txn_count
+            FROM expenses
+            GROUP BY ALL
+        )
+        SELECT *,
+               amount / SUM(amount) OVER seg * 100 AS percent_of_segment,
+               (amount - AVG(amount) OVER seg) / NULLIF(STDDEV_POP(amount) OVER seg, 0) AS z_score
+        FROM totals
+        WINDOW seg AS (PARTITION BY department, category)
+        ORDER BY department, category, {by}
+    """).df()
+
+# -----------------------------
+# 🚨 Transaction Z-Scores + Weekend Flags
+# -----------------------------
+
+def flagged_transactions(con, threshold=THRESHOLDS["transaction"]):
+    """
+    Transactions that are z-score outliers within their segment or fall on a
+    weekend; weekend and holiday flags are joined from the `calendar` dimension.
+    """
+    return con.execute("""
+        SELECT e.id, e.date, e.department, e.category, e.employee, e.vendor, e.amount,
+               (e.amount - AVG(e.amount) OVER seg) / NULLIF(STDDEV_POP(e.amount) OVER seg, 0) AS z_score,
+               COALESCE(c.is_weekend, false) AS is_weekend,
+               COALESCE(c.is_holiday, false) AS is_holiday
+        FROM expenses e
+        LEFT JOIN calendar c ON c.date = CAST(e.date AS DATE)
+        WINDOW seg AS (PARTITION BY e.department, e.category)
+        QUALIFY ABS(z_score) > ? OR is_weekend
+        ORDER BY e.department, e.category, e.date, e.id
+    """, [threshold]).df()
+
+# -----------------------------
+# ❌ Missing Categories
+# -----------------------------
+
+def missing_segments(con):
+    """
+    Department–category pairs with no spend, among the departments and
+    categories seen in `expenses`. A category nobody spent in is not listed,
+    so to check one category, count its transactions instead (as 05 does).
+    """
+    return con.execute("""
+        WITH seen AS (SELECT DISTINCT department, category FROM expenses)
+        SELECT d.department, c.category
+        FROM (SELECT DISTINCT department FROM seen) d
+        CROSS JOIN (SELECT DISTINCT category FROM seen) c
+        ANTI JOIN seen s USING (department, category)
+        ORDER BY d.department, c.category
+    """).df()
+
+# -----------------------------
+# 📦 Function: All Segments
+# -----------------------------
+
+def segment_outliers(con, thresholds=THRESHOLDS):
+    """Every segment check in one call; entity frames carry an `is_outlier` flag."""
+    results = {}
+    for by in ("employee", "vendor"):
+        scores = entity_scores(con, by)
+        scores["is_outlier"] = scores["z_score"].abs() > thresholds[by]
+        results[by] = scores
+    results["transaction"] = flagged_transactions(con, thresholds["transaction"])
+    results["missing"] = missing_segments(con)
+    return results
+
+
+if __name__ == "__main__":
+    results = segment_outliers(connect_expenses(**connect_options(sys.argv)))
+
+    for by in ("employee", "vendor"):
+        flagged = results[by][results[by]["is_outlier"]]
+        print(f"🚩 {by.title()} Outliers (|z| > {THRESHOLDS[by]}) — All Segments:")
+        print(flagged.to_string(index=False) if not flagged.empty else "None")
+        print("\n" + "="*50 + "\n")
+
+    print(f"🚨 Transaction Outliers (|z| > {THRESHOLDS['transaction']}) and Weekend Purchases:")
+    print(results["transaction"].to_string(index=False))
+    print("\n" + "="*50 + "\n")
+
+    print("❌ Department–Category Pairs With No Spend:")
+    print(results["missing"].to_string(index=False))
@@ -0,0 +1,328 @@
+# ============================================================
+# 🛰️ service.py
+# ------------------------------------------------------------
+"""
+Local query service that keeps one expense source hot in memory.
+The transactions are loaded once into an in-memory DuckDB database with
+the calendar and a monthly rollup alongside, and the shared GROUPING SETS
+aggregates and all-segment z-scores are computed at startup. The analyses are served as parameterized JSON endpoints on
+localhost HTTP or a Unix socket. Each request borrows a cursor from a fixed
+pool and narrows `expenses` to its department/category/date filters with a
+temp view on that cursor, so concurrent requests never see each other's
+filters. The data does not change while the service runs, so responses are
+also kept in an LRU keyed on endpoint and parameters.
+
+Usage (from the project folder):
+    python -m expense_analysis.service [path] [--port 8765 | --socket /tmp/expenses.sock] [--pool 8]
+    curl "http://127.0.0.1:8765/segment-outliers?department=Sales&category=Travel"
+"""
+
+import argparse
+import json
+import queue
+import signal
+import socketserver
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import duckdb
+import pandas as pd
+
+from expense_analysis import concentration, duplicates, policy, rollups, runner, segments
+from expense_analysis.calendar_dim import register_calendar
+from expense_analysis.compact import load_compact
+from expense_analysis.loader import DATA_PATH
+from expense_analysis.partitions import filter_view
+
+HOST = "127.0.0.1"
+PORT = 8765
+POOL_SIZE = 8                # cursors, i.e. requests querying at once
+POOL_TIMEOUT = 30            # seconds a request waits for a free cursor before a 503
+ROW_LIMIT = 1000             # rows per table in a response unless ?limit= says otherwise
+RESULT_CACHE_SIZE = 256
+
+# Query parameter -> filter key used by partitions.filter_sql()
+FILTER_PARAMS = {"department": "department", "category": "category", "from": "start", "to": "end"}
+
+# Same query as 06_same_day_vendor.py, for filtered requests
+SAME_DAY_SQL = """
+    SELECT employee, vendor, date, COUNT(*) AS txn_count, SUM(amount) AS total_amount
+    FROM expenses
+    GROUP BY employee, vendor, date
+    HAVING COUNT(*) > 1
+    ORDER BY txn_count DESC, total_amount DESC
+"""
+
+# -----------------------------
+# 🔥 Hot Dataset
+# -----------------------------
+
+class CursorPool:
+    """A fixed set of cursors on one database; each request borrows one."""
+
+    def __init__(self, con, size=POOL_SIZE):
+        self.size = size
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(con.cursor())
+
+    @contextmanager
+    def cursor(self, filters=None, timeout=POOL_TIMEOUT):
+        """Borrow a cursor whose `expenses` is narrowed to the filters (temp view, this cursor only)."""
+        cur = self._idle.get(timeout=timeout)
+        try:
+            filter_view(cur, filters)
+            yield cur
+        finally:
+            cur.execute("DROP VIEW IF EXISTS temp.main.expenses")
+            self._idle.put(cur)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+class HotDataset:
+    """The source loaded once, with derived tables, a cursor pool and a response cache."""
+
+    def __init__(self, path=DATA_PATH, pool_size=POOL_SIZE):
+        start = time.perf_counter()
+        self.path = Path(path)
+
+        # Registered frames are private to the connection that registered
+        # them, so the data is copied into tables every cursor can read
+        expenses = load_compact(path)
+        self.con = expenses.register(duckdb.connect(), view="compact_expenses")
+        register_calendar(self.con, name="calendar_frame", years=expenses.years())
+        self.con.execute("""
+            CREATE TABLE expenses AS
+            SELECT * FROM compact_expenses ORDER BY department, category, date, id
+        """)
+        self.con.execute("CREATE TABLE calendar AS SELECT * FROM calendar_frame")
+        self.con.execute("""
+            CREATE TABLE monthly_rollup AS
+            SELECT
+                DATE_TRUNC('month', date) AS month,
+                COALESCE(department, 'Unknown') AS department,
+                COALESCE(category, 'Unknown') AS category,
+                COALESCE(vendor, 'Unknown') AS vendor,
+                SUM(amount) AS total_spend,
+                COUNT(*) AS txn_count
+            FROM expenses
+            WHERE date IS NOT NULL
+            GROUP BY ALL
+        """)
+        self.con.unregister("compact_expenses")
+        self.con.unregister("calendar_frame")
+
+        self.rows = self.con.execute("SELECT COUNT(*) FROM expenses").fetchone()[0]
+        self.aggregates = runner.compute_aggregates(self.con)
+        self.segments = segments.segment_outliers(self.con)
+        self.rules = policy.load_rules()
+        self.pool = CursorPool(self.con, pool_size)
+        self.respond = lru_cache(maxsize=RESULT_CACHE_SIZE)(self._respond)
+        self.loaded_seconds = time.perf_counter() - start
+
+    def _respond(self, endpoint, params):
+        """JSON body for one endpoint call (params: sorted tuple of query pairs)."""
+        params = dict(params)
+        limit = int(params.pop("limit", ROW_LIMIT))
+        filters = {FILTER_PARAMS[key]: params.pop(key) for key in list(params) if key in FILTER_PARAMS}
+        handler, allowed = ENDPOINTS[endpoint]
+        unknown = set(params) - set(allowed)
+        if unknown:
+            raise ValueError(f"Unknown parameter(s) for {endpoint}: {', '.join(sorted(unknown))}")
+        result = handler(self, filters, **params)
+        if isinstance(result, dict):
+            body = {name: _records(frame, limit) for name, frame in result.items()}
+        else:
+            body = _records(result, limit)
+        return json.dumps(body, default=str).encode()
+
+    def warm(self):
+        """Answer every endpoint once without filters, so the default views start cached."""
+        start = time.perf_counter()
+        for endpoint in ENDPOINTS:
+            self.respond(endpoint, ())
+        return time.perf_counter() - start
+
+    def close(self):
+        self.pool.close()
+        self.con.close()
+
+
+def _records(frame, limit):
+    rows = json.loads(frame.head(limit).to_json(orient="records", date_format="iso"))
+    return {"total": len(frame), "returned": len(rows), "rows": rows}
+
+# -----------------------------
+# 📡 Endpoints (dataset, filters, **params) -> frame or {name: frame}
+# -----------------------------
+
+def policy_endpoint(data, filters):
+    """04: policy violations."""
+    with data.pool.cursor(filters) as cur:
+        return policy.evaluate_policies(cur, data.rules)
+
+
+def same_day_endpoint(data, filters, window_days=duplicates.WINDOW_DAYS):
+    """06: same-day repeats, near-duplicates and split purchases."""
+    with data.pool.cursor(filters) as cur:
+        # Unfiltered: straight from the aggregates computed at startup
+        repeats = cur.execute(SAME_DAY_SQL).df() if filters else runner.same_day_repeats(data.aggregates)
+        return {
+            "same_day": repeats,
+            "near_duplicates": duplicates.near_duplicates(cur, int(window_days)),
+            "split_purchases": duplicates.split_purchases(cur, data.rules, int(window_days)),
+        }
+
+
+def vendor_concentration_endpoint(data, filters, window_days=concentration.WINDOW_DAYS, step="month"):
+    """07: rolling vendor concentration and its per-window trend."""
+    with data.pool.cursor(filters) as cur:
+        rolling = concentration.rolling_concentration(cur, int(window_days), step)
+    return {"trend": concentration.concentration_trend(rolling), "vendors": rolling}
+
+
+def monthly_spend_endpoint(data, filters):
+    """03: monthly spend from the in-memory rollup."""
+    with data.pool.cursor() as cur:
+        return rollups.monthly_trend(cur, filters.get("department"), filters.get("category"),
+                                     filters.get("start"), filters.get("end"))
+
+
+def segment_outliers_endpoint(data, filters, employee=None, vendor=None, transaction=None):
+    """02/05: employee, vendor and transaction z-scores for every segment the filters keep."""
+    thresholds = {**segments.THRESHOLDS, **{key: float(value) for key, value in
+                  {"employee": employee, "vendor": vendor, "transaction": transaction}.items() if value}}
+    if set(filters) - set(segments.SEGMENT) or transaction:
+        with data.pool.cursor(filters) as cur:
+            return segments.segment_outliers(cur, thresholds)
+
+    # Scores are per segment, so a department/category request is a slice
+    # of the all-segment results computed at startup
+    results = {}
+    for kind, frame in data.segments.items():
+        keep = pd.Series(True, index=frame.index)
+        for column, value in filters.items():
+            keep &= frame[column] == value
+        rows = frame[keep].reset_index(drop=True)
+        if kind in ("employee", "vendor"):
+            rows["is_outlier"] = rows["z_score"].abs() > thresholds[kind]
+        results[kind] = rows
+    return results
+
+
+# path -> (handler, accepted parameters besides the filters and `limit`)
+ENDPOINTS = {
+    "/policy": (policy_endpoint, []),
+    "/same-day": (same_day_endpoint, ["window_days"]),
+    "/vendor-concentration": (vendor_concentration_endpoint, ["window_days", "step"]),
+    "/monthly-spend": (monthly_spend_endpoint, []),
+    "/segment-outliers": (segment_outliers_endpoint, ["employee", "vendor", "transaction"]),
+}
+
+# -----------------------------
+# 🌐 HTTP Server
+# -----------------------------
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """GET <endpoint>?params -> JSON; /health reports the dataset and pool."""
+
+    def do_GET(self):
+        start = time.perf_counter()
+        data = self.server.dataset
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            info = {"source": str(data.path), "rows": data.rows, "loaded_seconds": round(data.loaded_seconds, 3),
+                    "pool": data.pool.size, "endpoints": list(ENDPOINTS), "cache": data.respond.cache_info()._asdict()}
+            return self._send(200, json.dumps(info).encode(), start)
+        if url.path not in ENDPOINTS:
+            return self._send(404, _error(f"Unknown endpoint {url.path}; try /health"), start)
+        hits = data.respond.cache_info().hits
+        try:
+            body = data.respond(url.path, tuple(sorted(parse_qsl(url.query))))
+        except (ValueError, TypeError, duckdb.Error) as exc:
+            return self._send(400, _error(str(exc)), start)
+        except queue.Empty:
+            return self._send(503, _error("All cursors busy; retry"), start)
+        self._send(200, body, start, cache="hit" if data.respond.cache_info().hits > hits else "miss")
+
+    def _send(self, status, body, start, cache=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Elapsed-Ms", f"{(time.perf_counter() - start) * 1000:.1f}")
+        if cache:
+            self.send_header("X-Cache", cache)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix-socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+
+def _error(message):
+    return json.dumps({"error": message}).encode()
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        Path(self.server_address).unlink(missing_ok=True)    # stale socket from a previous run
+        super().server_bind()
+
+
+def serve(dataset, host=HOST, port=PORT, socket_path=None):
+    """Serve the dataset until interrupted (blocking)."""
+    if socket_path:
+        server, where = UnixHTTPServer(str(socket_path), RequestHandler), f"unix:{socket_path}"
+    else:
+        server, where = ThreadingHTTPServer((host, port), RequestHandler), f"http://{host}:{port}"
+    server.dataset = dataset
+    # Stop the same way on SIGTERM (e.g. from a service manager) as on Ctrl-C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"🛰️ Serving {dataset.rows:,} rows from {dataset.path} on {where} "
+          f"(loaded in {dataset.loaded_seconds:.2f}s, {dataset.pool.size} cursors)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped")
+    finally:
+        server.server_close()
+        if socket_path:
+            Path(socket_path).unlink(missing_ok=True)
+
+
+def start_background(dataset, host=HOST, port=0):
+    """Serve on a background thread (port 0 picks a free one); returns (server, url)."""
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.dataset = dataset
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the expense analyses from a hot in-memory dataset.")
+    parser.add_argument("source", nargs="?", default=DATA_PATH, help="expense CSV/Parquet file")
+    parser.add_argument("--host", default=HOST, help="address to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=PORT, help="TCP port")
+    parser.add_argument("--socket", default=None, help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--pool", type=int, default=POOL_SIZE, help="cursors, i.e. queries that run at once")
+    parser.add_argument("--no-warm", action="store_true", help="skip answering each endpoint once at startup")
+    args = parser.parse_args()
+
+    dataset = HotDataset(args.source, args.pool)
+    if not args.no_warm:
+        print(f"🔥 Warmed the unfiltered endpoints in {dataset.warm():.2f}s")
+    try:
+        serve(dataset, args.host, args.port, args.socket)
+    finally:
+        dataset.close()
@@ -0,0 +1,452 @@
+# ============================================================
+# 📐 sketches.py
+# ------------------------------------------------------------
+"""
+Bounded-memory approximate analytics from mergeable sketches.
+One streaming pass over a source keeps, per department × category × month:
+running moments (count, mean, variance) for z-scores, a KLL sketch for
+amount quantiles, HyperLogLog counts of distinct vendors and employees, and
+Count-Min heavy hitters for the top vendors by spend and transaction count.
+Sketches are cached per source content hash and merge without rereading
+raw rows: months roll up into quarters or all time, and sources roll up
+into one fleet-wide view.
+
+Usage (from the project folder):
+    python -m expense_analysis.sketches ["exports/*.csv" ...]     # fleet-wide summary
+    python scripts/01_category_benchmarks.py --approx
+"""
+
+import copy
+import glob
+import math
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from expense_analysis.loader import DATA_PATH, _cache_dir, _remove_stale, connect_expenses, source_fingerprint
+from expense_analysis.outliers import RunningStats
+
+APPROX_FLAG = "--approx"
+
+KLL_K = 200               # ~1% rank error for quantiles
+HLL_PRECISION = 11        # 2,048 registers, ~2.3% error on distinct counts
+CM_WIDTH, CM_DEPTH = 256, 4
+TOP_K = 32                # heavy-hitter vendors kept per sketch
+BATCH_ROWS = 500_000      # rows held in memory while sketching
+
+KEYS = ["department", "category", "month"]
+
+# -----------------------------
+# 📏 Class: KLL Quantiles
+# -----------------------------
+
+class KLL:
+    """KLL quantile sketch: levels of sorted-and-halved samples, level h weighing 2**h."""
+
+    def __init__(self, k=KLL_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        # Lower levels get geometrically less room (c = 2/3)
+        return max(2, math.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) < self._capacity(level):
+                level += 1
+                continue
+            items = np.sort(self.levels[level])
+            keep, items = (items[-1:], items[:-1]) if len(items) % 2 else (items[:0], items)
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            # Every other item (random offset) moves up one level at double weight
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[self.rng.integers(2)::2]])
+            self.levels[level] = keep
+            level = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+
+    def quantiles(self, qs):
+        """Approximate values at quantiles qs (0–1); NaN when empty."""
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        if not self.n:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, qs * cumulative[-1], side="left")
+        return items[order][np.clip(index, 0, len(items) - 1)]
+
+    def to_dict(self):
+        return {"k": self.k, "n": self.n, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["k"])
+        sketch.n, sketch.levels = data["n"], list(data["levels"])
+        return sketch
+
+# -----------------------------
+# 🔢 Class: HyperLogLog
+# -----------------------------
+
+def _hashes(values, key="0123456789123456"):
+    # pandas' SipHash of the values: stable across processes, so sketches merge
+    return pd.util.hash_array(np.asarray(values, dtype=object), hash_key=key)
+
+
+class HyperLogLog:
+    """Distinct-count sketch: per register, the longest run of leading zero bits seen."""
+
+    def __init__(self, precision=HLL_PRECISION):
+        # precision >= 11 keeps the remaining hash bits exact as float64 below
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        hashes = _hashes(values)
+        bits = 64 - self.precision
+        register = (hashes >> np.uint64(bits)).astype(np.int64)
+        rest = (hashes & np.uint64((1 << bits) - 1)).astype(np.float64)
+        rank = bits - np.frexp(rest)[1] + 1              # leading zeros + 1
+        np.maximum.at(self.registers, register, rank.astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)           # linear counting for small sets
+        return int(round(estimate))
+
+    @classmethod
+    def from_registers(cls, registers):
+        sketch = cls(int(len(registers)).bit_length() - 1)
+        sketch.registers = registers
+        return sketch
+
+# -----------------------------
+# 🏆 Class: Count-Min Heavy Hitters
+# -----------------------------
+
+class CountMin:
+    """Count-Min sketch: `depth` hashed rows of counters; estimates never undercount."""
+
+    def __init__(self, width=CM_WIDTH, depth=CM_DEPTH):
+        self.table = np.zeros((depth, width))
+
+    def _columns(self, keys):
+        # Double hashing: column d is (h1 + d * h2) mod width
+        first, second = _hashes(keys), _hashes(keys, "9876543210987654")
+        depth, width = self.table.shape
+        return np.stack([(first + np.uint64(d) * second) % np.uint64(width) for d in range(depth)]).astype(np.int64)
+
+    def update(self, keys, weights):
+        columns = self._columns(keys)
+        for row in range(self.table.shape[0]):
+            np.add.at(self.table[row], columns[row], weights)
+
+    def estimate(self, keys):
+        columns = self._columns(keys)
+        return self.table[np.arange(self.table.shape[0])[:, None], columns].min(axis=0)
+
+    def merge(self, other):
+        self.table += other.table
+
+
+class HeavyHitters:
+    """Top keys by weight: Count-Min estimates of spend and count, plus the candidate keys."""
+
+    def __init__(self, top=TOP_K, width=CM_WIDTH, depth=CM_DEPTH):
+        self.top = top
+        self.spend = CountMin(width, depth)
+        self.count = CountMin(width, depth)
+        self.candidates = np.empty(0, dtype=object)
+
+    def update(self, keys, spend, count):
+        self.spend.update(keys, spend)
+        self.count.update(keys, count)
+        self._keep(np.concatenate([self.candidates, np.asarray(keys, dtype=object)]))
+
+    def merge(self, other):
+        self.spend.merge(other.spend)
+        self.count.merge(other.count)
+        self._keep(np.concatenate([self.candidates, other.candidates]))
+
+    def _keep(self, keys):
+        keys = pd.unique(keys)
+        order = np.argsort(-self.spend.estimate(keys), kind="stable")[:self.top]
+        self.candidates = keys[order]
+
+    def items(self):
+        """Candidate keys with estimated spend and count, largest spend first."""
+        return pd.DataFrame({
+            "key": self.candidates,
+            "spend": self.spend.estimate(self.candidates),
+            "count": self.count.estimate(self.candidates).astype(np.int64),
+        })
+
+    def to_dict(self):
+        return {"top": self.top, "spend": self.spend.table, "count": self.count.table, "candidates": self.candidates}
+
+    @classmethod
+    def from_dict(cls, data):
+        depth, width = data["spend"].shape
+        sketch = cls(data["top"], width, depth)
+        sketch.spend.table, sketch.count.table = data["spend"], data["count"]
+        sketch.candidates = data["candidates"]
+        return sketch
+
+# -----------------------------
+# 🧩 Class: Segment Sketch
+# -----------------------------
+
+class SegmentSketch:
+    """Every sketch kept for one segment (and month)."""
+
+    def __init__(self):
+        self.total = 0.0
+        self.stats = RunningStats()
+        self.quantiles = KLL()
+        self.vendors = HyperLogLog()
+        self.employees = HyperLogLog()
+        self.top_vendors = HeavyHitters()
+
+    def update(self, amounts, vendors, employees):
+        valid = amounts[~np.isnan(amounts)]
+        self.total += float(valid.sum())
+        self.stats.add_many(valid)
+        self.quantiles.update(valid)
+        self.vendors.update(vendors)
+        self.employees.update(employees)
+        codes, names = pd.factorize(vendors)
+        spend = np.bincount(codes, weights=np.nan_to_num(amounts), minlength=len(names))
+        self.top_vendors.update(names, spend, np.bincount(codes, minlength=len(names)))
+
+    def merge(self, other):
+        self.total += other.total
+        self.stats.merge(other.stats)
+        self.quantiles.merge(other.quantiles)
+        self.vendors.merge(other.vendors)
+        self.employees.merge(other.employees)
+        self.top_vendors.merge(other.top_vendors)
+
+    def to_dict(self):
+        return {
+            "total": self.total,
+            "stats": self.stats.to_list(),
+            "quantiles": self.quantiles.to_dict(),
+            "vendors": self.vendors.registers,
+            "employees": self.employees.registers,
+            "top_vendors": self.top_vendors.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls.__new__(cls)
+        sketch.total = data["total"]
+        sketch.stats = RunningStats(*data["stats"])
+        sketch.quantiles = KLL.from_dict(data["quantiles"])
+        sketch.vendors = HyperLogLog.from_registers(data["vendors"])
+        sketch.employees = HyperLogLog.from_registers(data["employees"])
+        sketch.top_vendors = HeavyHitters.from_dict(data["top_vendors"])
+        return sketch
+
+# -----------------------------
+# 🗂️ Class: Sketch Set
+# -----------------------------
+
+def period_label(month, period):
+    """A 'YYYY-MM' month's label for period 'all', 'month' or 'quarter' (as in tiers.PERIODS)."""
+    if period == "all":
+        return "All"
+    if period == "month" or month == "Unknown":
+        return month
+    return f"{month[:4]}-Q{(int(month[5:7]) - 1) // 3 + 1}"
+
+
+class SketchSet:
+    """Segment sketches keyed by department, category and month; merges and rolls up."""
+
+    def __init__(self, keys=KEYS):
+        self.keys = list(keys)
+        self.segments = {}
+        self.rows = 0
+
+    def update(self, frame):
+        """Fold one batch of rows (KEYS + vendor, employee, amount) into the sketches."""
+        self.rows += len(frame)
+        amounts = frame["amount"].to_numpy(dtype=float, na_value=np.nan)
+        vendors = frame["vendor"].to_numpy(dtype=object)
+        employees = frame["employee"].to_numpy(dtype=object)
+        for key, rows in frame.groupby(self.keys, sort=False).indices.items():
+            sketch = self.segments.setdefault(key, SegmentSketch())
+            sketch.update(amounts[rows], vendors[rows], employees[rows])
+
+    def merge(self, other):
+        """Fold another set with the same keys (another day, partition or source) into this one."""
+        self.rows += other.rows
+        for key, sketch in other.segments.items():
+            if key in self.segments:
+                self.segments[key].merge(sketch)
+            else:
+                self.segments[key] = copy.deepcopy(sketch)
+        return self
+
+    def rollup(self, keys=(), period=None):
+        """Merge into coarser segments: a subset of the keys, plus a `period` label if given."""
+        keys = list(keys)
+        rolled = SketchSet(keys + (["period"] if period else []))
+        rolled.rows = self.rows
+        for key, sketch in self.segments.items():
+            labels = dict(zip(self.keys, key))
+            new_key = tuple(labels[k] for k in keys) + ((period_label(labels["month"], period),) if period else ())
+            if new_key in rolled.segments:
+                rolled.segments[new_key].merge(sketch)
+            else:
+                rolled.segments[new_key] = copy.deepcopy(sketch)
+        return rolled
+
+    def to_dict(self):
+        """Plain arrays and numbers only, so the pickled cache does not depend on these classes."""
+        return {"keys": self.keys, "rows": self.rows,
+                "segments": [(key, sketch.to_dict()) for key, sketch in self.segments.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketches = cls(data["keys"])
+        sketches.rows = data["rows"]
+        sketches.segments = {tuple(key): SegmentSketch.from_dict(sketch) for key, sketch in data["segments"]}
+        return sketches
+
+    def nbytes(self):
+        return len(pickle.dumps(self.to_dict(), protocol=pickle.HIGHEST_PROTOCOL))
+
+    # -------- answers --------
+
+    def segment_summary(self, keys=("department", "category"), qs=(0.5, 0.9, 0.99)):
+        """Per-segment count, total, mean, std, amount quantiles and distinct vendors/employees."""
+        rolled = self.rollup(keys)
+        records = []
+        for key, sketch in sorted(rolled.segments.items()):
+            stats = sketch.stats
+            records.append({
+                **dict(zip(rolled.keys, key)),
+                "txn_count": stats.count, "total_spend": round(sketch.total, 2),
+                "mean": stats.mean, "std": stats.std,
+                **{f"p{round(q * 100)}": value for q, value in zip(qs, sketch.quantiles.quantiles(qs))},
+                "vendors": sketch.vendors.count(), "employees": sketch.employees.count(),
+            })
+        return pd.DataFrame(records)
+
+    def vendor_summary(self):
+        """Company-wide vendor, total_spend and txn_count for the heavy-hitter vendors."""
+        (sketch,) = self.rollup().segments.values()
+        items = sketch.top_vendors.items()
+        return (items.rename(columns={"key": "vendor", "spend": "total_spend", "count": "txn_count"})
+                .sort_values("total_spend", ascending=False, ignore_index=True))
+
+    def category_shares(self, period="all"):
+        """% of department spend by category per period, as tiers.category_shares() returns it."""
+        rolled = self.rollup(["department", "category"], period)
+        shares = pd.DataFrame(
+            [(*key, sketch.total) for key, sketch in rolled.segments.items()],
+            columns=["department", "category", "period", "category_total"],
+        )
+        department_total = shares.groupby(["department", "period"])["category_total"].transform("sum")
+        shares["percent_of_dept_spend"] = (100.0 * shares["category_total"] / department_total).round(2)
+        return shares.drop(columns="category_total")
+
+# -----------------------------
+# 🏗️ Functions: Build / Load
+# -----------------------------
+
+def build_sketches(path=DATA_PATH, batch_rows=BATCH_ROWS):
+    """Sketch a source in one streaming pass, holding at most batch_rows rows at a time."""
+    con = connect_expenses(path, streaming=True)
+    reader = con.execute("""
+        SELECT
+            COALESCE(department, 'Unknown') AS department,
+            COALESCE(category, 'Unknown') AS category,
+            COALESCE(STRFTIME(date, '%Y-%m'), 'Unknown') AS month,
+            COALESCE(vendor, 'Unknown') AS vendor,
+            COALESCE(employee, 'Unknown') AS employee,
+            CAST(amount AS DOUBLE) AS amount
+        FROM expenses
+    """).to_arrow_reader(batch_rows)
+    sketches = SketchSet()
+    for batch in reader:
+        sketches.update(batch.to_pandas())
+    con.close()
+    return sketches
+
+
+def load_sketches(path=DATA_PATH):
+    """A source's sketches, cached under data/.cache/sketches/ and rebuilt when its content changes."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_path = _cache_dir(path) / "sketches" / f"{stem}-{source_fingerprint(path)[:16]}.pkl"
+    if cache_path.exists():
+        return SketchSet.from_dict(pickle.loads(cache_path.read_bytes()))
+
+    sketches = build_sketches(path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    _remove_stale(cache_path.parent, stem, ".pkl", keep=cache_path)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_bytes(pickle.dumps(sketches.to_dict(), protocol=pickle.HIGHEST_PROTOCOL))
+    os.replace(tmp_path, cache_path)
+    return sketches
+
+
+def fleet_sketches(sources):
+    """Merged sketches of every file matching the sources (paths or globs)."""
+    paths = sorted({match for source in sources for match in glob.glob(str(source))})
+    if not paths:
+        raise FileNotFoundError(f"No expense files match {', '.join(map(str, sources))}")
+    fleet = SketchSet()
+    for path in paths:
+        fleet.merge(load_sketches(path))
+    return fleet, paths
+
+
+if __name__ == "__main__":
+    sources = sys.argv[1:] or [DATA_PATH]
+    start = time.perf_counter()
+    fleet, paths = fleet_sketches(sources)
+    print(f"📐 Sketched {len(paths)} source(s), {fleet.rows:,} rows, in {time.perf_counter() - start:.2f}s "
+          f"({fleet.nbytes() / 1024 ** 2:.1f} MB of sketches)")
+
+    print("\n🧩 Segments (approximate quantiles and distinct counts):")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(fleet.segment_summary().round(2).to_string(index=False))
+
+    vendors = fleet.vendor_summary()
+    vendors["percent_of_total"] = (vendors["total_spend"] / fleet.rollup().segments[()].total * 100).round(2)
+    print(f"\n🏪 Top {len(vendors)} Vendors by Spend:")
+    print(vendors.round(2).to_string(index=False))
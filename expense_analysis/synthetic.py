@@ -0,0 +1,134 @@
+# ============================================================
+# 🧪 synthetic.py
+# ------------------------------------------------------------
+"""
+Generates synthetic expense exports with the SmallCompany.csv schema
+(id,date,department,vendor,employee,category,amount) at any size.
+Vendors follow a Zipf distribution within each category, spend is seasonal
+by month, and a small share of rows are planted outliers and near-duplicates.
+Rows are generated and written in chunks, so 100M-row files fit in memory.
+
+Usage (from the project folder):
+    python -m expense_analysis.synthetic 1000000 data/synthetic/expenses_1000000.csv
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+BASE_DEPARTMENTS = ["Engineering", "HR", "IT", "Marketing", "Sales"]
+
+# category -> (well-known vendors, lognormal mu, lognormal sigma) for amounts
+CATEGORY_PROFILES = {
+    "Meals": (["Chipotle", "Panera", "Local Cafe", "DoorDash"], 3.4, 0.4),
+    "Office Supplies": (["Staples", "Amazon", "Office Depot"], 5.7, 0.6),
+    "Software": (["Slack", "Adobe", "Microsoft", "Atlassian"], 7.2, 0.4),
+    "Training": (["Udemy", "Coursera", "LinkedIn Learning"], 6.8, 0.5),
+    "Travel": (["Delta Airlines", "Marriott", "Hilton", "Uber"], 6.3, 0.6),
+}
+
+# Relative spend by calendar month (Jan..Dec): quiet summer, busy Q4 and June
+MONTH_WEIGHTS = np.array([1.0, 0.8, 1.0, 0.9, 1.1, 1.3, 0.6, 0.8, 1.0, 1.1, 1.0, 1.3])
+
+# -----------------------------
+# 🎲 Helpers
+# -----------------------------
+
+def _zipf_weights(n, a):
+    weights = 1.0 / np.arange(1, n + 1) ** a
+    return weights / weights.sum()
+
+
+def _dimensions(n_departments, n_employees, vendors_per_category):
+    departments = BASE_DEPARTMENTS + [f"Dept {i:03d}" for i in range(len(BASE_DEPARTMENTS), n_departments)]
+    employees = [f"Employee {i:05d}" for i in range(n_employees)]
+    vendors = {
+        category: known + [f"{category} Vendor {i:03d}" for i in range(len(known), vendors_per_category)]
+        for category, (known, _, _) in CATEGORY_PROFILES.items()
+    }
+    return np.array(departments[:n_departments], dtype=object), np.array(employees, dtype=object), vendors
+
+# -----------------------------
+# 🏭 Function: Generate Dataset
+# -----------------------------
+
+def generate(rows, path, seed=0, n_departments=5, n_employees=None, vendors_per_category=50,
+             zipf_a=1.3, outlier_rate=0.005, duplicate_rate=0.01,
+             start="2024-07-01", days=365, chunk_size=1_000_000):
+    """Write `rows` synthetic transactions to a CSV at `path`; returns the path."""
+    rng = np.random.default_rng(seed)
+    n_employees = n_employees or max(6, rows // 2000)
+    departments, employees, vendors = _dimensions(n_departments, n_employees, vendors_per_category)
+    categories = np.array(list(CATEGORY_PROFILES), dtype=object)
+
+    # Each department has its own category mix; vendors are Zipfian within a category
+    dept_mix = rng.dirichlet(np.ones(len(categories)), size=len(departments))
+    vendor_weights = _zipf_weights(vendors_per_category, zipf_a)
+    vendor_table = np.array([vendors[c] for c in categories], dtype=object)
+    mu = np.array([CATEGORY_PROFILES[c][1] for c in categories])
+    sigma = np.array([CATEGORY_PROFILES[c][2] for c in categories])
+
+    # Seasonal day weights and pre-formatted M/D/YY strings for every day
+    day_range = np.arange(np.datetime64(start), np.datetime64(start) + days)
+    months = day_range.astype("datetime64[M]").astype(int) % 12
+    day_weights = MONTH_WEIGHTS[months] / MONTH_WEIGHTS[months].sum()
+    day_strings = np.array(
+        [f"{d.month}/{d.day}/{d.year % 100:02d}" for d in day_range.astype(object)], dtype=object
+    )
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    schema = pa.schema([
+        ("id", pa.int64()), ("date", pa.string()), ("department", pa.string()),
+        ("vendor", pa.string()), ("employee", pa.string()), ("category", pa.string()),
+        ("amount", pa.float64()),
+    ])
+    options = pacsv.WriteOptions(include_header=False, quoting_style="none")
+
+    next_id = 1
+    with open(path, "wb") as f, pacsv.CSVWriter(f, schema, write_options=options) as writer:
+        f.write((",".join(schema.names) + "\n").encode())
+        for offset in range(0, rows, chunk_size):
+            n = min(chunk_size, rows - offset)
+            n_dupes = int(n * duplicate_rate)
+            n_base = n - n_dupes
+
+            dept = rng.integers(0, len(departments), n_base)
+            # Inverse-CDF draw of a category from each row's department mix
+            cum_mix = dept_mix.cumsum(axis=1)[dept]
+            cat = (rng.random(n_base)[:, None] > cum_mix).sum(axis=1).clip(max=len(categories) - 1)
+            vendor = rng.choice(vendors_per_category, n_base, p=vendor_weights)
+            employee = rng.integers(0, n_employees, n_base)
+            day = rng.choice(len(day_range), n_base, p=day_weights)
+            amount = rng.lognormal(mu[cat], sigma[cat])
+
+            outliers = rng.random(n_base) < outlier_rate
+            amount[outliers] *= rng.uniform(5, 15, outliers.sum())
+
+            # Near-duplicates: copies of random rows a few days later with a tiny amount change
+            src = rng.integers(0, n_base, n_dupes)
+            dept, cat, vendor, employee = (np.concatenate([a, a[src]]) for a in (dept, cat, vendor, employee))
+            day = np.concatenate([day, np.minimum(day[src] + rng.integers(0, 3, n_dupes), len(day_range) - 1)])
+            amount = np.concatenate([amount, amount[src] * (1 + rng.normal(0, 0.01, n_dupes))])
+
+            order = rng.permutation(n)
+            writer.write_table(pa.table({
+                "id": np.arange(next_id, next_id + n),
+                "date": day_strings[day[order]],
+                "department": departments[dept[order]],
+                "vendor": vendor_table[cat[order], vendor[order]],
+                "employee": employees[employee[order]],
+                "category": categories[cat[order]],
+                "amount": np.round(amount[order], 2),
+            }, schema=schema))
+            next_id += n
+    return path
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    out = sys.argv[2] if len(sys.argv) > 2 else f"data/synthetic/expenses_{n_rows}.csv"
+    print(f"🧪 Wrote {n_rows:,} rows to {generate(n_rows, out)}")
@@ -0,0 +1,155 @@
+# ============================================================
+# 🎚️ tiers.py
+# ------------------------------------------------------------
+"""
+Category benchmark tiers, computed for every period at once.
+Category shares are laid out as a department × category × period array.
+Per-period category averages, 33rd/66th percentile cutoffs, tier midpoints
+and deviations from each pair's expected tier are then whole-array NumPy
+operations, so tracking drift month by month costs no more Python than a
+single all-time benchmark. Expected tiers live in config/expected_tiers.csv.
+"""
+
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+TIERS_PATH = Path("config/expected_tiers.csv")
+
+TIER_NAMES = ["Low", "Medium–Low", "Medium", "Medium–High", "High"]
+DEFAULT_TIER = "Medium"
+CUTOFF_PERCENTILES = (33, 66)
+
+# Period -> SQL expression labeling each transaction's period
+PERIODS = {
+    "all": "'All'",
+    "month": "STRFTIME(date, '%Y-%m')",
+    "quarter": "CONCAT(YEAR(date), '-Q', QUARTER(date))",
+}
+
+# -----------------------------
+# 📋 Function: Load Expected Tiers
+# -----------------------------
+
+def load_expected_tiers(path=TIERS_PATH):
+    """Read the (department, category) -> expected tier table and validate tier names."""
+    tiers = pd.read_csv(path)
+    unknown = set(tiers["tier"]) - set(TIER_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown benchmark tier(s): {', '.join(sorted(unknown))}")
+    return tiers
+
+# -----------------------------
+# 🧊 Function: Category Share Cube
+# -----------------------------
+
+def category_shares(con, period="all"):
+    """Long table of department, category, period and percent_of_dept_spend."""
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period {period!r}; expected one of {', '.join(PERIODS)}")
+    return con.execute(f"""
+        WITH category_spend AS (
+            SELECT department, category, {PERIODS[period]} AS period, SUM(amount) AS category_total
+            FROM expenses
+            GROUP BY ALL
+        )
+        SELECT
+            department, category, period,
+            ROUND(100.0 * category_total / SUM(category_total) OVER (PARTITION BY department, period), 2)
+                AS percent_of_dept_spend
+        FROM category_spend
+    """).df()
+
+
+def share_cube(con, period="all", shares=None):
+    """
+    % of department spend by category for each period, as a
+    (departments, categories, periods) array plus its axis labels.
+    Pairs with no spend in a period are NaN. `shares` is a precomputed
+    category_shares() table (e.g. from sketches.py) to use instead of `con`.
+    """
+    if shares is None:
+        shares = category_shares(con, period)
+    axes = [np.sort(shares[col].unique()) for col in ("department", "category", "period")]
+    codes = [np.searchsorted(labels, shares[col].to_numpy())
+             for labels, col in zip(axes, ("department", "category", "period"))]
+    cube = np.full([len(labels) for labels in axes], np.nan)
+    cube[tuple(codes)] = shares["percent_of_dept_spend"].to_numpy()
+    return cube, axes
+
+# -----------------------------
+# 🎯 Function: Tier Benchmarks
+# -----------------------------
+
+def _masked_mean(values, mask):
+    # Row means of the cells selected by mask (NaN where none are)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(mask, values, 0).sum(axis=1) / mask.sum(axis=1)
+
+
+def tier_midpoints(deviation):
+    """
+    Midpoints of the five tiers for each period from a (periods, cells)
+    deviation array: means of the cells below, between and above the
+    33rd/66th percentile cutoffs, plus the halfway points between them.
+    A tier with no cells in a period (e.g. many pairs tied at the cutoff)
+    falls back to its cutoff, so its midpoint is never NaN.
+    """
+    deviation = np.sort(deviation, axis=1)
+    low_cut, high_cut = np.percentile(deviation, CUTOFF_PERCENTILES, axis=1)[:, :, None]
+    low = _masked_mean(deviation, deviation < low_cut)
+    medium = _masked_mean(deviation, (deviation >= low_cut) & (deviation <= high_cut))
+    high = _masked_mean(deviation, deviation > high_cut)
+    low_cut, high_cut = low_cut[:, 0], high_cut[:, 0]
+    low = np.where(np.isnan(low), low_cut, low)
+    medium = np.where(np.isnan(medium), (low_cut + high_cut) / 2, medium)
+    high = np.where(np.isnan(high), high_cut, high)
+    # Rows follow TIER_NAMES, columns are periods
+    return np.stack([low, (low + medium) / 2, medium, (medium + high) / 2, high])
+
+
+def benchmark_deviations(cube, departments, categories, expected_tiers):
+    """
+    Deviation of every (department, category, period) share from its
+    category's period average, and from the midpoint of its expected tier.
+    Returns (deviation from average, deviation from expected, tier codes).
+    """
+    # Category average over the departments that spent in it, as in a groupby mean
+    # (NaN, without a warning, for a category no department spent in that period)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        category_avg = np.round(np.nanmean(cube, axis=0), 2)
+    deviation = np.nan_to_num(cube - category_avg)
+
+    tier_lookup = expected_tiers.set_index(["department", "category"])["tier"].map(TIER_NAMES.index)
+    index = pd.MultiIndex.from_product([departments, categories])
+    tier_codes = (tier_lookup.reindex(index).fillna(TIER_NAMES.index(DEFAULT_TIER))
+                  .astype(int).to_numpy().reshape(len(departments), len(categories)))
+
+    midpoints = tier_midpoints(deviation.reshape(-1, cube.shape[2]).T)
+    benchmark = midpoints[tier_codes, :]
+    return deviation, np.round(deviation - benchmark, 2), tier_codes
+
+
+def tier_comparison(con, period="all", expected_tiers=None, shares=None):
+    """
+    Long table of department, category, period, percent_of_dept_spend,
+    expected_tier, deviation_from_avg and dev_from_expected.
+    """
+    if expected_tiers is None:
+        expected_tiers = load_expected_tiers()
+    cube, (departments, categories, periods) = share_cube(con, period, shares)
+    deviation, from_expected, tier_codes = benchmark_deviations(cube, departments, categories, expected_tiers)
+
+    dept_idx, cat_idx, period_idx = np.indices(cube.shape).reshape(3, -1)
+    return pd.DataFrame({
+        "department": departments[dept_idx],
+        "category": categories[cat_idx],
+        "period": periods[period_idx],
+        "percent_of_dept_spend": cube.ravel(),
+        "expected_tier": np.array(TIER_NAMES, dtype=object)[tier_codes[dept_idx, cat_idx]],
+        "deviation_from_avg": deviation.ravel(),
+        "dev_from_expected": from_expected.ravel(),
+    })
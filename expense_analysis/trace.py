@@ -0,0 +1,259 @@
+# ============================================================
+# 🔬 trace.py
+# ------------------------------------------------------------
+"""
+Per-stage instrumentation for the analysis scripts.
+Run any script with --trace and each emoji section becomes a stage with
+wall time, CPU time, peak Python memory (tracemalloc), process peak RSS,
+rows in/out and the DuckDB profile of every query it ran. The stages are
+written to a JSON trace under outputs/traces/ when the script exits, and two
+traces can be compared stage by stage. Without --trace every call is a no-op.
+
+Usage (from the project folder):
+    python scripts/01_category_benchmarks.py --trace
+    python -m expense_analysis.trace outputs/traces/old.json outputs/traces/new.json
+"""
+
+import atexit
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+TRACE_FLAG = "--trace"
+TRACE_DIR = Path("outputs/traces")
+
+# DuckDB profile fields kept per query (the rest of the tree is summarized as top operators)
+PROFILE_FIELDS = ["latency", "cpu_time", "rows_returned", "cumulative_rows_scanned", "system_peak_buffer_memory"]
+TOP_OPERATORS = 5
+
+_active = None
+
+# -----------------------------
+# 🦆 DuckDB Query Profiles
+# -----------------------------
+
+def _operators(node):
+    for child in node.get("children", []):
+        yield child
+        yield from _operators(child)
+
+
+def _profile_summary(con, sql):
+    profile = json.loads(con.get_profiling_information(format="json"))
+    summary = {"sql": " ".join(sql.split())[:200], **{field: profile.get(field) for field in PROFILE_FIELDS}}
+    operators = sorted(_operators(profile), key=lambda op: op.get("operator_timing", 0), reverse=True)
+    summary["top_operators"] = [
+        {"operator": op.get("operator_type"), "seconds": op.get("operator_timing"),
+         "rows": op.get("operator_cardinality")}
+        for op in operators[:TOP_OPERATORS]
+    ]
+    return summary
+
+
+class TracedResult:
+    """A query result that records its profile once it has been fetched."""
+
+    FETCHES = {"df", "fetchdf", "fetchall", "fetchone", "fetchnumpy", "arrow", "fetch_arrow_table", "pl"}
+
+    def __init__(self, owner, result, sql):
+        self.owner = owner
+        self.result = result
+        self.sql = sql
+
+    def __getattr__(self, name):
+        attr = getattr(self.result, name)
+        if name not in self.FETCHES:
+            return attr
+
+        def fetch(*args, **kwargs):
+            value = attr(*args, **kwargs)
+            summary = _profile_summary(self.owner.con, self.sql)
+            if name != "fetchone":
+                # The profile's rows_returned misses rows streamed to pandas/Arrow
+                summary["rows_returned"] = len(value)
+            self.owner.tracer.record_query(summary)
+            return value
+        return fetch
+
+
+class TracedConnection:
+    """DuckDB connection wrapper that profiles each query into the active stage."""
+
+    def __init__(self, con, tracer):
+        self.con = con
+        self.tracer = tracer
+        con.execute("PRAGMA enable_profiling = 'no_output'")
+
+    def execute(self, sql, parameters=None):
+        result = self.con.execute(sql, parameters) if parameters is not None else self.con.execute(sql)
+        return TracedResult(self, result, sql)
+
+    def __getattr__(self, name):
+        return getattr(self.con, name)
+
+# -----------------------------
+# ⏱️ Class: Tracer
+# -----------------------------
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Tracer:
+    """Records stages of one script run and writes them as a JSON trace."""
+
+    def __init__(self, script, argv=(), output_dir=TRACE_DIR):
+        self.script = script
+        self.argv = list(argv)
+        self.output_dir = Path(output_dir)
+        self.started = datetime.now()
+        self.stages = []
+        self.current = None
+        tracemalloc.start()
+
+    def mark(self, name):
+        """End the current stage (if any) and start a new one called `name`."""
+        self._close()
+        tracemalloc.reset_peak()
+        self.current = {
+            "stage": name, "queries": [], "rows_in": None, "rows_out": None,
+            "_wall": time.perf_counter(), "_cpu": time.process_time(),
+        }
+
+    @contextmanager
+    def stage(self, name):
+        """Context-manager form of mark() for code that is not flat."""
+        self.mark(name)
+        try:
+            yield self
+        finally:
+            self._close()
+
+    def rows(self, rows_in=None, rows_out=None):
+        """Set the current stage's row counts (defaults come from its queries)."""
+        if self.current is not None:
+            if rows_in is not None:
+                self.current["rows_in"] = int(rows_in)
+            if rows_out is not None:
+                self.current["rows_out"] = int(rows_out)
+
+    def record_query(self, summary):
+        if self.current is not None:
+            self.current["queries"].append(summary)
+
+    def watch(self, con):
+        """Wrap a DuckDB connection so its queries are profiled into the current stage."""
+        return TracedConnection(con, self)
+
+    def _close(self):
+        stage, self.current = self.current, None
+        if stage is None:
+            return
+        queries = stage["queries"]
+        if stage["rows_in"] is None and queries:
+            stage["rows_in"] = sum(q["cumulative_rows_scanned"] or 0 for q in queries)
+        if stage["rows_out"] is None and queries:
+            stage["rows_out"] = sum(q["rows_returned"] or 0 for q in queries)
+        stage.update(
+            wall_s=round(time.perf_counter() - stage.pop("_wall"), 4),
+            cpu_s=round(time.process_time() - stage.pop("_cpu"), 4),
+            py_peak_mb=round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 2),
+            rss_peak_mb=round(_peak_rss_mb(), 1),
+        )
+        stage["queries"] = stage.pop("queries")     # keep the summary fields first in the JSON
+        self.stages.append(stage)
+
+    def write(self):
+        """Close the open stage and write the trace; returns its path."""
+        self._close()
+        trace = {
+            "script": self.script,
+            "argv": self.argv,
+            "started": self.started.isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "total_wall_s": round(sum(stage["wall_s"] for stage in self.stages), 4),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "stages": self.stages,
+        }
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"{self.script}-{self.started:%Y%m%d-%H%M%S}.json"
+        path.write_text(json.dumps(trace, indent=2, default=str, ensure_ascii=False))
+        print(f"🔬 Trace written to {path}")
+        return path
+
+
+class NullTracer:
+    """Stand-in when tracing is off: every call does nothing."""
+
+    def mark(self, name):
+        pass
+
+    @contextmanager
+    def stage(self, name):
+        yield self
+
+    def rows(self, rows_in=None, rows_out=None):
+        pass
+
+    def watch(self, con):
+        return con
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# -----------------------------
+# ▶️ Functions: Start / Active
+# -----------------------------
+
+def start(script, argv=None):
+    """Tracer for a script: active (and written at exit) when --trace is in argv."""
+    global _active
+    argv = sys.argv if argv is None else argv
+    if TRACE_FLAG not in argv:
+        return NullTracer()
+    _active = Tracer(Path(script).stem, argv[1:])
+    atexit.register(_active.write)
+    return _active
+
+
+def active():
+    """The running script's Tracer, or None when tracing is off."""
+    return _active
+
+# -----------------------------
+# 📈 Function: Compare Traces
+# -----------------------------
+
+def compare(old_path, new_path):
+    """Print per-stage wall time and peak memory of two traces side by side."""
+    old = {s["stage"]: s for s in json.loads(Path(old_path).read_text())["stages"]}
+    new = json.loads(Path(new_path).read_text())["stages"]
+    for stage in new:
+        before = old.get(stage["stage"])
+        if before and before["wall_s"]:
+            ratio = f"x{stage['wall_s'] / before['wall_s']:.2f}"
+        else:
+            ratio = "new"
+        print(f"⏱️ {stage['stage']:<45} {stage['wall_s']:>8.3f}s ({ratio:>6}) "
+              f"| py peak {stage['py_peak_mb']:.1f} MB | rows {stage['rows_in']} → {stage['rows_out']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m expense_analysis.trace OLD.json NEW.json")
+    compare(sys.argv[1], sys.argv[2])
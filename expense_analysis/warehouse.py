@@ -0,0 +1,112 @@
+# ============================================================
+# 🏛️ warehouse.py
+# ------------------------------------------------------------
+"""
+Persistent DuckDB warehouse for one expense source.
+The transactions are ingested once into data/.cache/<source>.duckdb as an
+`expenses` table sorted by (department, category, date), so zone maps skip
+row groups for segment and date-range filters, with ART indexes on
+(department, category, date) and (employee, vendor, date). The file is keyed
+on the source's content hash: later runs open it read-only and start warm,
+and several auditors can query it at once.
+
+Usage (from the project folder):
+    python -m expense_analysis.warehouse [path] [--rebuild]
+"""
+
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import duckdb
+
+from expense_analysis.loader import DATA_PATH, scan_sql, source_fingerprint
+
+REBUILD_FLAG = "--rebuild"
+
+SORT_ORDER = ["department", "category", "date"]
+INDEXES = {
+    "expenses_dept_cat_date": ["department", "category", "date"],
+    "expenses_emp_vendor_date": ["employee", "vendor", "date"],
+}
+
+# -----------------------------
+# 🏗️ Function: Build Warehouse
+# -----------------------------
+
+def warehouse_path(path=DATA_PATH):
+    """Database file for a source: data/.cache/<stem>.duckdb next to its other caches."""
+    path = Path(path)
+    return path.parent / ".cache" / f"{path.stem}.duckdb"
+
+
+def _built_from(con):
+    try:
+        return con.execute("SELECT sha256 FROM warehouse_meta").fetchone()[0]
+    except duckdb.CatalogException:
+        return None
+
+
+def build_warehouse(path=DATA_PATH, db_path=None, rebuild=False):
+    """
+    Ingest the source into its warehouse file unless it already holds this
+    exact content. Returns (db path, whether it was rebuilt).
+    """
+    db_path = Path(db_path or warehouse_path(path))
+    fingerprint = source_fingerprint(path)
+    if db_path.exists() and not rebuild:
+        with duckdb.connect(str(db_path), read_only=True) as con:
+            if _built_from(con) == fingerprint:
+                return db_path, False
+
+    # Built in a new file and swapped in: auditors' open read-only sessions hold
+    # a lock on the old file, and keep reading it until they reconnect
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = db_path.with_name(f"{db_path.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        with duckdb.connect(str(tmp_path)) as con:
+            con.execute("BEGIN TRANSACTION")
+            con.execute(f"""
+                CREATE OR REPLACE TABLE expenses AS
+                SELECT
+                    id, date, department, vendor, employee, category,
+                    CAST(amount AS DECIMAL(18, 2)) AS amount
+                FROM {scan_sql(path)}
+                ORDER BY {", ".join(SORT_ORDER)}
+            """)
+            for name, columns in INDEXES.items():
+                con.execute(f"CREATE INDEX {name} ON expenses ({', '.join(columns)})")
+            con.execute("CREATE OR REPLACE TABLE warehouse_meta (source VARCHAR, sha256 VARCHAR, row_count BIGINT, built_at TIMESTAMP)")
+            con.execute(
+                "INSERT INTO warehouse_meta SELECT ?, ?, COUNT(*), ? FROM expenses",
+                [str(path), fingerprint, datetime.now()],
+            )
+            con.execute("COMMIT")
+            con.execute("CHECKPOINT")
+        os.replace(tmp_path, db_path)
+    finally:
+        # Left behind only by a failed build
+        for leftover in (tmp_path, tmp_path.with_name(f"{tmp_path.name}.wal")):
+            leftover.unlink(missing_ok=True)
+    return db_path, True
+
+# -----------------------------
+# 🔌 Function: Connect
+# -----------------------------
+
+def connect_warehouse(path=DATA_PATH, db_path=None, rebuild=False):
+    """Read-only connection to the source's warehouse, (re)building it first if stale."""
+    db_path, _ = build_warehouse(path, db_path, rebuild)
+    return duckdb.connect(str(db_path), read_only=True)
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    source = args[0] if args else DATA_PATH
+    db_path, rebuilt = build_warehouse(source, rebuild=REBUILD_FLAG in sys.argv)
+    with duckdb.connect(str(db_path), read_only=True) as con:
+        rows, built_at = con.execute("SELECT row_count, built_at FROM warehouse_meta").fetchone()
+    state = "Built" if rebuilt else "Up to date:"
+    print(f"🏛️ {state} {db_path} ({rows:,} rows, ingested {built_at:%Y-%m-%d %H:%M})")
@@ -5,42 +5,44 @@
 Groups total company expenses by month to visualize spending cycles, spot seasonal spikes, or highlight unusual surges.  
 """
 
-import duckdb
+import sys
+from pathlib import Path
 import pandas as pd
-import matplotlib.pyplot as plt
 
-# ------------------------------------------------------------
-# 1️⃣ Load and Prepare Expense Data
-# ------------------------------------------------------------
-df = pd.read_csv("data/SmallCompany.csv")
-df['date'] = pd.to_datetime(df['date'], errors='coerce')  # Ensure datetime format
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from expense_analysis import rollups, trace
+from expense_analysis.partitions import parse_filters
+
+tracer = trace.start(__file__)   # --trace: write per-stage timings to outputs/traces/
 
 # ------------------------------------------------------------
-# 2️⃣ Register DuckDB Table
+# 1️⃣ Refresh the Persistent Monthly Rollup
 # ------------------------------------------------------------
-con = duckdb.connect()
-con.register("expenses", df)
+tracer.mark("1️⃣ Refresh the Persistent Monthly Rollup")
+# Only rows with an id above the stored watermark are read and folded in;
+# pass --rebuild to recompute the rollup from scratch.
+con, new_rows = rollups.refresh_rollup(rebuild=rollups.REBUILD_FLAG in sys.argv)
+print(f"🔄 Folded {new_rows} new transaction(s) into the monthly rollup")
 
 # ------------------------------------------------------------
-# 3️⃣ Query: Monthly Total Spend
+# 2️⃣ Query: Monthly Total Spend (from the rollup)
 # ------------------------------------------------------------
-monthly_trend = con.execute("""
-    SELECT 
-        DATE_TRUNC('month', date) AS month,
-        SUM(amount) AS total_spend
-    FROM expenses
-    GROUP BY month
-    ORDER BY month;
-""").df()
+tracer.mark("2️⃣ Query: Monthly Total Spend")
+# --from=/--to= (and --department=/--category=) limit the trend to a slice
+monthly_trend = rollups.monthly_trend(con, **parse_filters(sys.argv))
 
 # ------------------------------------------------------------
-# 4️⃣ Clean and Format for Plotting
+# 3️⃣ Clean and Format for Plotting
 # ------------------------------------------------------------
+tracer.mark("3️⃣ Clean and Format for Plotting")
 monthly_trend['month'] = pd.to_datetime(monthly_trend['month'])
 
 # ------------------------------------------------------------
-# 5️⃣ Plot: Company-Wide Monthly Spend
+# 4️⃣ Plot: Company-Wide Monthly Spend
 # ------------------------------------------------------------
+tracer.mark("4️⃣ Plot: Company-Wide Monthly Spend")
+import matplotlib.pyplot as plt   # only needed from here on
+
 plt.figure(figsize=(10, 5))
 plt.plot(monthly_trend['month'], monthly_trend['total_spend'], marker='o')
 plt.title("📊 Company-Wide Monthly Spend (All Departments)")
@@ -5,66 +5,53 @@
 Scans all transactions across the company and flags any that exceed category-specific spending limits.
 """
 
-import pandas as pd
+import sys
+from pathlib import Path
 
-# -----------------------------------------------------
-# 1️⃣ Load Expense Data
-# -----------------------------------------------------
-df = pd.read_csv("data/SmallCompany.csv")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from expense_analysis import trace
+from expense_analysis.loader import connect_expenses, connect_options
+from expense_analysis.policy import load_rules, evaluate_policies
 
-# -----------------------------------------------------
-# 2️⃣ Meals Policy: Max $55 per meal per employee
-# -----------------------------------------------------
-df_meals_over = df[
-    (df['category'] == 'Meals') &
-    (df['amount'] > 55)
-]
+tracer = trace.start(__file__)   # --trace: write per-stage timings to outputs/traces/
 
 # -----------------------------------------------------
-# 3️⃣ Travel Policy: Max $855 per day per employee
-# -----------------------------------------------------
-df_travel = df[df['category'] == 'Travel']
-daily_travel = df_travel.groupby(['employee', 'date'])['amount'].sum().reset_index()
-daily_travel_over = daily_travel[daily_travel['amount'] > 855]
-
-# -----------------------------------------------------
-# 4️⃣ Training Policy: Max $1,400 per employee per course
+# 1️⃣ Load Expense Data
 # -----------------------------------------------------
-df_training_over = df[
-    (df['category'] == 'Training') &
-    (df['amount'] > 1400)
-]
+tracer.mark("1️⃣ Load Expense Data")
+con = connect_expenses(**connect_options(sys.argv))
 
 # -----------------------------------------------------
-# 5️⃣ Office Supplies Policy: Any transaction > $650
+# 2️⃣ Load Policy Rules (config/policy_rules.csv)
 # -----------------------------------------------------
-df_office_supplies_over = df[
-    (df['category'] == 'Office Supplies') &
-    (df['amount'] > 650)
-]
+tracer.mark("2️⃣ Load Policy Rules")
+# Meals:           Max $55 per meal per employee
+# Travel:          Max $855 per day per employee
+# Training:        Max $1,400 per employee per course
+# Office Supplies: Any transaction > $650
+# Software:        New software > $2,000 requires approval
+rules = load_rules()
 
 # -----------------------------------------------------
-# 6️⃣ Software Policy: New software > $2,000 requires approval
+# 3️⃣ Evaluate All Rules (one query per scope)
 # -----------------------------------------------------
-df_software_over = df[
-    (df['category'] == 'Software') &
-    (df['amount'] > 2000)
-]
+tracer.mark("3️⃣ Evaluate All Rules")
+violations = evaluate_policies(con, rules)
 
 # -----------------------------------------------------
-# 7️⃣ Display Flagged Policy Violations
+# 4️⃣ Display Flagged Policy Violations
 # -----------------------------------------------------
-print("🚩 Meals Policy Violations:\n", df_meals_over)
-print("\n🚩 Travel Policy Violations:\n", daily_travel_over)
-print("\n🚩 Training Policy Violations:\n", df_training_over)
-print("\n🚩 Office Supplies Policy Violations:\n", df_office_supplies_over)
-print("\n🚩 Software Policy Violations:\n", df_software_over)
+tracer.mark("4️⃣ Display Flagged Policy Violations")
+for rule in rules.itertuples():
+    flagged = violations[violations['rule_id'] == rule.rule_id]
+    print(f"🚩 {rule.category} Policy Violations ({rule.rule_id}: {rule.description}):")
+    if flagged.empty:
+        print("None\n")
+        continue
+    flagged = flagged.dropna(axis=1, how='all').drop(columns=['rule_id', 'scope', 'category'])
+    print(flagged, end="\n\n")
 
 # -----------------------------------------------------
 # (Optional) Save to CSV (Uncomment to export)
 # -----------------------------------------------------
-# df_meals_over.to_csv("outputs/policy_meals_over.csv", index=False)
-# daily_travel_over.to_csv("outputs/policy_travel_over.csv", index=False)
-# df_training_over.to_csv("outputs/policy_training_over.csv", index=False)
-# df_office_supplies_over.to_csv("outputs/policy_office_supplies_over.csv", index=False)
-# df_software_over.to_csv("outputs/policy_software_over.csv", index=False)
+# violations.to_csv("outputs/policy_violations.csv", index=False)
@@ -5,35 +5,48 @@
 Provides a quick summary of how the Sales team spent across all categories except Office Supplies (which was covered in a full detailed analysis). Flags all timing issues and outliers.
 """
 
-import pandas as pd
-import duckdb
-from scipy.stats import zscore
+import sys
+from pathlib import Path
 
-# -----------------------------------------------------
-# 1️⃣ Load Data and Create Flags
-# -----------------------------------------------------
-df = pd.read_csv("data/SmallCompany.csv")
-df['date'] = pd.to_datetime(df['date'], errors='coerce')
-df['day_of_week'] = df['date'].dt.dayofweek
-df['is_weekend'] = df['day_of_week'] >= 5
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from expense_analysis import trace
+from expense_analysis.loader import connect_expenses, connect_options
+from expense_analysis.segments import segment_outliers
+
+tracer = trace.start(__file__)   # --trace: write per-stage timings to outputs/traces/
 
 # -----------------------------------------------------
-# 2️⃣ Register with DuckDB
+# 1️⃣ Load Data and Score Every Segment
 # -----------------------------------------------------
-con = duckdb.connect()
-con.register("sales_data", df)
+tracer.mark("1️⃣ Load Data and Score Every Segment")
+# --stream: DuckDB reads the CSV directly instead of a pandas copy
+# --warehouse: query the persistent, indexed warehouse file (built once per source)
+# --cache: reuse saved query results while the data is unchanged
+# --partitioned: read only the Sales partitions (--from=/--to= narrow the dates)
+# The view holds Sales rows only; one grouped pass scores each of its categories.
+con = connect_expenses(**connect_options(sys.argv, department='Sales'))
+results = segment_outliers(con)
+
+
+def sales_slice(kind, category):
+    """Sales rows for one category from the all-segment results."""
+    frame = results[kind]
+    rows = frame[(frame['department'] == 'Sales') & (frame['category'] == category)]
+    return rows.drop(columns=['department', 'category']).reset_index(drop=True)
+
+
+def weekend_transactions(category):
+    """Sales transactions in one category made on a Saturday or Sunday."""
+    rows = sales_slice('transaction', category)
+    return rows[rows['is_weekend']][['date', 'employee', 'vendor', 'amount']]
 
 # -----------------------------------------------------
-# 3️⃣ Travel Spend – Sales Department
+# 2️⃣ Travel Spend – Sales Department
 # -----------------------------------------------------
-sales_travel = con.execute("""
-    SELECT * FROM sales_data
-    WHERE department = 'Sales' AND category = 'Travel'
-""").df()
+tracer.mark("2️⃣ Travel Spend – Sales Department")
 
 # Employee-Level Travel Spend
-employee_travel = sales_travel.groupby('employee')['amount'].sum().reset_index()
-employee_travel['z_score'] = zscore(employee_travel['amount'])
+employee_travel = sales_slice('employee', 'Travel')[['employee', 'amount', 'z_score']]
 
 print("✈️ Travel Spend by Employee (Sales Dept):")
 print(employee_travel.sort_values('amount', ascending=False))
@@ -43,8 +56,7 @@ print(employee_travel[employee_travel['z_score'] > 1.5])
 print("\n" + "="*50 + "\n")
 
 # Vendor-Level Travel Spend
-vendor_travel = sales_travel.groupby('vendor')['amount'].sum().reset_index()
-vendor_travel['z_score'] = zscore(vendor_travel['amount'])
+vendor_travel = sales_slice('vendor', 'Travel')[['vendor', 'amount', 'z_score']]
 
 print("✈️ Travel Spend by Vendor (Sales Dept):")
 print(vendor_travel.sort_values('amount', ascending=False))
@@ -54,22 +66,18 @@ print(vendor_travel[vendor_travel['z_score'] > 1.5])
 print("\n" + "="*50 + "\n")
 
 # Weekend Travel Transactions
-weekend_travel = sales_travel[sales_travel['is_weekend']]
+weekend_travel = weekend_transactions('Travel')
 print("📅 Weekend Travel Transactions (Sales Dept):")
-print(weekend_travel[['date', 'employee', 'vendor', 'amount']])
+print(weekend_travel)
 print("\n" + "="*50 + "\n")
 
 # -----------------------------------------------------
-# 4️⃣ Meals Spend – Sales Department
+# 3️⃣ Meals Spend – Sales Department
 # -----------------------------------------------------
-sales_meals = con.execute("""
-    SELECT * FROM sales_data
-    WHERE department = 'Sales' AND category = 'Meals'
-""").df()
+tracer.mark("3️⃣ Meals Spend – Sales Department")
 
 # Employee-Level Meals Spend
-employee_meals = sales_meals.groupby('employee')['amount'].sum().reset_index()
-employee_meals['z_score'] = zscore(employee_meals['amount'])
+employee_meals = sales_slice('employee', 'Meals')[['employee', 'amount', 'z_score']]
 
 print("🍽️ Meals Spend by Employee (Sales Dept):")
 print(employee_meals.sort_values('amount', ascending=False))
@@ -79,21 +87,17 @@ print(employee_meals[employee_meals['z_score'] > 1.0])
 print("\n" + "="*50 + "\n")
 
 # Weekend Meals Transactions
-weekend_meals = sales_meals[sales_meals['is_weekend']]
+weekend_meals = weekend_transactions('Meals')
 print("📅 Weekend Meals Transactions (Sales Dept):")
-print(weekend_meals[['date', 'employee', 'vendor', 'amount']])
+print(weekend_meals)
 print("\n" + "="*50 + "\n")
 
 # -----------------------------------------------------
-# 5️⃣ Missing Spend Categories Check
+# 4️⃣ Missing Spend Categories Check
 # -----------------------------------------------------
-missing_categories = ['Software', 'Training']
-for cat in missing_categories:
-    count = con.execute(f"""
-        SELECT COUNT(*) FROM sales_data
-        WHERE department = 'Sales' AND category = '{cat}'
-    """).fetchone()[0]
-    
+tracer.mark("4️⃣ Missing Spend Categories Check")
+for cat in ['Software', 'Training']:
+    count = sales_slice('employee', cat)['txn_count'].sum()
     if count == 0:
         print(f"❌ No {cat} spend found for Sales")
     else:
@@ -3,25 +3,32 @@
 # ------------------------------------------------------------
 """
 Checks for cases where an employee made multiple purchases from the same vendor on the same day — which could signal batching, duplicates, or policy issues. 
+Also flags near-duplicates (same employee and vendor within a few days, similar amounts) and split purchases that add up to more than a policy limit.
 """
 
-import pandas as pd
-import duckdb
+import sys
+from pathlib import Path
 
-# ------------------------------------------------------------
-# 1️⃣ Load Data
-# ------------------------------------------------------------
-df = pd.read_csv("data/SmallCompany.csv")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from expense_analysis import trace
+from expense_analysis.loader import connect_expenses, connect_options
+from expense_analysis.duplicates import WINDOW_DAYS, near_duplicates, split_purchases
+
+tracer = trace.start(__file__)   # --trace: write per-stage timings to outputs/traces/
 
 # ------------------------------------------------------------
-# 2️⃣ Register Cleaned Data with DuckDB
+# 1️⃣ Load Data into DuckDB
 # ------------------------------------------------------------
-con = duckdb.connect()
-con.register("expenses", df)
+tracer.mark("1️⃣ Load Data into DuckDB")
+# --stream: DuckDB reads the CSV directly instead of a pandas copy
+# --warehouse: query the persistent, indexed warehouse file (built once per source)
+# --cache: reuse saved query results while the data is unchanged
+con = connect_expenses(**connect_options(sys.argv))
 
 # ------------------------------------------------------------
-# 3️⃣ Query: Same-Day Vendor Transactions by Employee
+# 2️⃣ Query: Same-Day Vendor Transactions by Employee
 # ------------------------------------------------------------
+tracer.mark("2️⃣ Query: Same-Day Vendor Transactions by Employee")
 repeat_vendor_day = con.execute("""
     SELECT 
         employee,
@@ -36,7 +43,24 @@ repeat_vendor_day = con.execute("""
 """).df()
 
 # ------------------------------------------------------------
-# 4️⃣ Display Results
+# 3️⃣ Display Results
 # ------------------------------------------------------------
+tracer.mark("3️⃣ Display Results")
 print("🔁 Same-Day Vendor Usage by Employee:")
 print(repeat_vendor_day)
+
+# ------------------------------------------------------------
+# 4️⃣ Near-Duplicates Within a Few Days
+# ------------------------------------------------------------
+tracer.mark("4️⃣ Near-Duplicates Within a Few Days")
+near_dupes = near_duplicates(con)
+print(f"\n🔍 Near-Duplicate Purchases (same employee & vendor within {WINDOW_DAYS} days, amounts within 5%):")
+print(near_dupes)
+
+# ------------------------------------------------------------
+# 5️⃣ Split Purchases Over a Policy Limit
+# ------------------------------------------------------------
+tracer.mark("5️⃣ Split Purchases Over a Policy Limit")
+splits = split_purchases(con)
+print(f"\n✂️ Possible Split Purchases (each under the limit, {WINDOW_DAYS}-day total over it):")
+print(splits)
@@ -3,62 +3,92 @@
 # ------------------------------------------------------------
 """
 Analyzes how much spend flows to each vendor, flags over reliance and identifies single-use vendors.
+Also tracks how concentration builds up per department over a trailing window.
 """
 
-import pandas as pd
-import duckdb
-from scipy.stats import zscore
+import sys
+from pathlib import Path
 
-# ------------------------------------------------------------
-# 1️⃣ Load and Clean Data
-# ------------------------------------------------------------
-df = pd.read_csv("data/SmallCompany.csv")
-df['date'] = pd.to_datetime(df['date'], errors='coerce')
-df['vendor'] = df['vendor'].fillna("Unknown")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from expense_analysis import trace
+from expense_analysis.concentration import WINDOW_DAYS, concentration_trend, rolling_concentration
+from expense_analysis.loader import connect_expenses, connect_options
+from expense_analysis.outliers import zscore
+from expense_analysis.sketches import APPROX_FLAG, load_sketches
+
+tracer = trace.start(__file__)   # --trace: write per-stage timings to outputs/traces/
 
 # ------------------------------------------------------------
-# 2️⃣ Register Data with DuckDB
+# 1️⃣ Load Data into DuckDB
 # ------------------------------------------------------------
-con = duckdb.connect()
-con.register("expenses", df)
+tracer.mark("1️⃣ Load Data into DuckDB")
+# --stream: DuckDB reads the CSV directly instead of a pandas copy
+# --warehouse: query the persistent, indexed warehouse file (built once per source)
+# --cache: reuse saved query results while the data is unchanged
+# --approx: vendor totals from the cached Count-Min heavy-hitter sketches, no raw rows
+sketches = load_sketches() if APPROX_FLAG in sys.argv else None
+con = None if sketches else connect_expenses(**connect_options(sys.argv))
 
 # ------------------------------------------------------------
-# 3️⃣ Aggregate Vendor Spend and Transaction Count
+# 2️⃣ Aggregate Vendor Spend and Transaction Count
 # ------------------------------------------------------------
-vendor_summary = con.execute("""
-    SELECT 
-        vendor,
-        SUM(amount) AS total_spend,
-        COUNT(*) AS txn_count
-    FROM expenses
-    GROUP BY vendor
-    ORDER BY total_spend DESC
-""").df()
+tracer.mark("2️⃣ Aggregate Vendor Spend and Transaction Count")
+if sketches:
+    # Estimates for the top vendors by spend (all of them unless there are more than TOP_K)
+    vendor_summary = sketches.vendor_summary()
+    company = sketches.rollup().segments[()]
+    total_spend = company.total
+    truncated = len(vendor_summary) == company.top_vendors.top and company.vendors.count() > len(vendor_summary)
+else:
+    vendor_summary = con.execute("""
+        SELECT 
+            COALESCE(vendor, 'Unknown') AS vendor,
+            SUM(amount) AS total_spend,
+            COUNT(*) AS txn_count
+        FROM expenses
+        GROUP BY 1
+        ORDER BY total_spend DESC
+    """).df()
 
 # ------------------------------------------------------------
-# 4️⃣ Add Percent of Total and Z-Score
+# 3️⃣ Add Percent of Total and Z-Score
 # ------------------------------------------------------------
-vendor_summary['percent_of_total'] = vendor_summary['total_spend'] / vendor_summary['total_spend'].sum() * 100
+tracer.mark("3️⃣ Add Percent of Total and Z-Score")
+# With --approx the listed vendors may be only the heavy hitters, so shares are
+# of the sketched company total rather than of the listed vendors' sum
+if not sketches:
+    total_spend = vendor_summary['total_spend'].sum()
+vendor_summary['percent_of_total'] = vendor_summary['total_spend'] / total_spend * 100
 vendor_summary['z_score'] = zscore(vendor_summary['total_spend'])
 
 # ------------------------------------------------------------
-# 5️⃣ Flag Vendor Risk Patterns
+# 4️⃣ Flag Vendor Risk Patterns
 # ------------------------------------------------------------
-def flag_vendor(row):
-    if row['percent_of_total'] >= 30:
-        return 'Hard High'
-    elif row['z_score'] > 1.96:
-        return 'Z Outlier'
-    elif row['txn_count'] == 1:
-        return 'Single-Use Vendor'
-    else:
-        return 'OK'
-
-vendor_summary['Flag'] = vendor_summary.apply(flag_vendor, axis=1)
+tracer.mark("4️⃣ Flag Vendor Risk Patterns")
+# Checked lowest priority first so the strongest flag wins
+vendor_summary['Flag'] = 'OK'
+vendor_summary.loc[vendor_summary['txn_count'] == 1, 'Flag'] = 'Single-Use Vendor'
+vendor_summary.loc[vendor_summary['z_score'] > 1.96, 'Flag'] = 'Z Outlier'
+vendor_summary.loc[vendor_summary['percent_of_total'] >= 30, 'Flag'] = 'Hard High'
 vendor_summary['percent_of_total'] = vendor_summary['percent_of_total'].round(2)
 
 # ------------------------------------------------------------
-# 6️⃣ Display Results
+# 5️⃣ Display Results
 # ------------------------------------------------------------
+tracer.mark("5️⃣ Display Results")
 print("🏪 Vendor Concentration Check — Company-Wide")
 print(vendor_summary[['vendor', 'total_spend', 'percent_of_total', 'z_score', 'txn_count', 'Flag']])
+if sketches and truncated:
+    print(f"\n⚠️ --approx lists the top {len(vendor_summary)} of ~{company.vendors.count():,} vendors by spend: z-scores "
+          f"are among those listed, and single-use vendors outside them are not shown")
+
+# ------------------------------------------------------------
+# 6️⃣ Rolling Concentration by Department (trailing window)
+# ------------------------------------------------------------
+tracer.mark("6️⃣ Rolling Concentration by Department")
+if sketches:
+    print("\n📈 Rolling concentration needs the raw transactions; skipped with --approx")
+else:
+    rolling = rolling_concentration(con, window_days=WINDOW_DAYS, step="month")
+    print(f"\n📈 Vendor Concentration by Department — Trailing {WINDOW_DAYS} Days, Month-End")
+    print(concentration_trend(rolling).to_string(index=False))
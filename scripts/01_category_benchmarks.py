@@ -7,138 +7,68 @@ to identify over/under-spending vs. custom tier expectations.
 See README.md for full detaila.
 """
 
-import os
-import pandas as pd
-import duckdb
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import sys
+from pathlib import Path
 
-# -----------------------------
-# 🖼️ Function: Generate Benchmark Heatmap
-# -----------------------------
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from expense_analysis import trace
+from expense_analysis.charts import HEADLESS_FLAG, ChartBatch, benchmark_heatmap
+from expense_analysis.loader import connect_expenses, connect_options
+from expense_analysis.sketches import APPROX_FLAG, load_sketches
+from expense_analysis.tiers import load_expected_tiers, tier_comparison
 
-def generate_benchmark_heatmap(pivot_table, output_path):
-    """Generate and save a heatmap of deviations from expected benchmarks."""
-    plt.figure(figsize=(10, 6))
-    sns.heatmap(pivot_table, annot=True, cmap="coolwarm", center=0, fmt=".1f")
-    plt.title("Deviation from Expected Benchmark by Category Tier")
-    plt.ylabel("Department")
-    plt.xlabel("Category")
-    plt.tight_layout()
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    plt.savefig(output_path, dpi=300, bbox_inches="tight")
-    plt.show()
+MONTHLY_FLAG = "--monthly"
+QUARTERLY_FLAG = "--quarterly"
 
 if __name__ == "__main__":
 
-    # -----------------------------
-    # 1️⃣ Load Data
-    # -----------------------------
-    df = pd.read_csv("data/SmallCompany.csv")
+    tracer = trace.start(__file__)   # --trace: write per-stage timings to outputs/traces/
 
     # -----------------------------
-    # 2️⃣ % of Department Spend by Category
+    # 1️⃣ Load Data (--stream: DuckDB reads the CSV directly; --warehouse: persistent
+    # indexed DB file; --cache: reuse saved query results while the data is unchanged;
+    # --approx: category totals from the cached per-segment sketches, no raw rows)
     # -----------------------------
-    df_dept_cat = duckdb.query("""
-        WITH dept_totals AS (
-            SELECT department, SUM(amount) AS dept_total
-            FROM df
-            GROUP BY department
-        ),
-        category_spend AS (
-            SELECT department, category, SUM(amount) AS category_total
-            FROM df
-            GROUP BY department, category
-        )
-        SELECT
-            cs.department,
-            cs.category,
-            ROUND(100.0 * cs.category_total / dt.dept_total, 2) AS percent_of_dept_spend
-        FROM category_spend cs
-        JOIN dept_totals dt
-        ON cs.department = dt.department
-    """).df()
+    tracer.mark("1️⃣ Load Data")
+    sketches = load_sketches() if APPROX_FLAG in sys.argv else None
+    con = None if sketches else connect_expenses(**connect_options(sys.argv))
 
-    # -----------------------------
-    # 3️⃣ Deviation from Category Average
-    # -----------------------------
-    category_avg = df_dept_cat.groupby('category')['percent_of_dept_spend'].mean().round(2)
-    df_dept_cat['deviation_from_avg'] = df_dept_cat['percent_of_dept_spend'] - df_dept_cat['category'].map(category_avg)
-
-    pivot_dev = df_dept_cat.pivot(index='department', columns='category', values='deviation_from_avg').fillna(0)
+    def shares(period):
+        """Category shares from the sketches in --approx mode (None: query the data)."""
+        return sketches.category_shares(period) if sketches else None
 
     # -----------------------------
-    # 4️⃣ Define Benchmark Tier Midpoints
+    # 2️⃣ Expected Tiers (config/expected_tiers.csv)
     # -----------------------------
-    deviation_values = pivot_dev.values.flatten()
-    sorted_dev = np.sort(deviation_values[~np.isnan(deviation_values)])
-
-    low_cutoff = np.percentile(sorted_dev, 33)
-    high_cutoff = np.percentile(sorted_dev, 66)
-
-    low_mid = np.mean(sorted_dev[sorted_dev < low_cutoff])
-    med_mid = np.mean(sorted_dev[(sorted_dev >= low_cutoff) & (sorted_dev <= high_cutoff)])
-    high_mid = np.mean(sorted_dev[sorted_dev > high_cutoff])
-    med_low_mid = (low_mid + med_mid) / 2
-    med_high_mid = (med_mid + high_mid) / 2
+    tracer.mark("2️⃣ Expected Tiers")
+    expected_tiers = load_expected_tiers()
 
     # -----------------------------
-    # 5️⃣ Manual Expected Tiers
+    # 3️⃣ Compare Actual vs Expected Tier Midpoints
     # -----------------------------
-    expected_tiers = {
-        ('Engineering', 'Meals'): 'Low',
-        ('Engineering', 'Office Supplies'): 'Medium–Low',
-        ('Engineering', 'Software'): 'High',
-        ('Engineering', 'Training'): 'Medium–High',
-        ('Engineering', 'Travel'): 'Low',
-
-        ('Marketing', 'Meals'): 'High',
-        ('Marketing', 'Office Supplies'): 'Medium',
-        ('Marketing', 'Software'): 'Medium–High',
-        ('Marketing', 'Training'): 'Medium',
-        ('Marketing', 'Travel'): 'High',
-
-        ('Sales', 'Meals'): 'High',
-        ('Sales', 'Office Supplies'): 'Low',
-        ('Sales', 'Software'): 'Medium–High',
-        ('Sales', 'Training'): 'Medium–High',
-        ('Sales', 'Travel'): 'High',
-
-        ('HR', 'Meals'): 'Medium',
-        ('HR', 'Office Supplies'): 'Medium',
-        ('HR', 'Software'): 'Low',
-        ('HR', 'Training'): 'High',
-        ('HR', 'Travel'): 'Medium',
-
-        ('IT', 'Meals'): 'Low',
-        ('IT', 'Office Supplies'): 'Medium',
-        ('IT', 'Software'): 'High',
-        ('IT', 'Training'): 'High',
-        ('IT', 'Travel'): 'Low',
-    }
+    tracer.mark("3️⃣ Compare Actual vs Expected Tier Midpoints")
+    # % of department spend by category, deviation from the category average,
+    # 33rd/66th percentile tier midpoints and deviation from each pair's
+    # expected tier, computed as one department × category × period array
+    df_comp = tier_comparison(con, "all", expected_tiers, shares("all"))
+    pivot_expected = df_comp.pivot(index='department', columns='category', values='dev_from_expected')
 
     # -----------------------------
-    # 6️⃣ Compare Actual vs Expected
+    # 4️⃣ Benchmark Drift by Period (pass --monthly or --quarterly)
     # -----------------------------
-    comparison = []
-    for dept in pivot_dev.index:
-        for cat in pivot_dev.columns:
-            actual_dev = pivot_dev.loc[dept, cat]
-            tier = expected_tiers.get((dept, cat), 'Medium')
-            benchmark = {
-                'Low': low_mid,
-                'Medium–Low': med_low_mid,
-                'Medium': med_mid,
-                'Medium–High': med_high_mid,
-                'High': high_mid
-            }[tier]
-            comparison.append((dept, cat, round(actual_dev - benchmark, 2)))
-
-    df_comp = pd.DataFrame(comparison, columns=['department', 'category', 'dev_from_expected'])
-    pivot_expected = df_comp.pivot(index='department', columns='category', values='dev_from_expected')
+    tracer.mark("4️⃣ Benchmark Drift by Period")
+    period = "month" if MONTHLY_FLAG in sys.argv else "quarter" if QUARTERLY_FLAG in sys.argv else None
+    if period:
+        drift = tier_comparison(con, period, expected_tiers, shares(period))
+        print(f"📈 Deviation from Expected Benchmark by {period.title()}:")
+        print(drift.pivot_table(index=['department', 'category'], columns='period',
+                                values='dev_from_expected').to_string())
 
     # -----------------------------
-    # 7️⃣ Heatmap of Deviation from Expected Benchmark
+    # 5️⃣ Heatmap of Deviation from Expected Benchmark
     # -----------------------------
-    generate_benchmark_heatmap(pivot_expected, "charts/benchmark_heatmap.png")
+    tracer.mark("5️⃣ Heatmap of Deviation from Expected Benchmark")
+    # --headless: render with Agg and skip the redraw when the pivot is unchanged
+    charts = ChartBatch(headless=HEADLESS_FLAG in sys.argv)
+    charts.add(benchmark_heatmap, pivot_expected, "charts/benchmark_heatmap.png", dpi=300)
+    charts.render()
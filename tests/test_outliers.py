@@ -0,0 +1,35 @@
+import math
+
+import pandas as pd
+
+from expense_analysis.outliers import UNKNOWN, OnlineOutlierDetector
+
+
+def history():
+    return pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "department": ["Sales", "Sales", None, "Sales|East"],
+        "category": ["Office Supplies", "Office Supplies", "Travel", "Meals"],
+        "employee": ["Ann", None, "Bo", "Cy"],
+        "vendor": ["Staples", "Amazon", None, "Diner"],
+        "amount": [100.0, 250.0, 80.0, 40.0],
+    })
+
+
+def test_blank_names_count_as_unknown_and_save(tmp_path):
+    detector = OnlineOutlierDetector.from_frame(history())
+    assert (UNKNOWN, "Travel") in detector.segments
+    assert UNKNOWN in detector.segments[("Sales", "Office Supplies")].totals["employee"]
+
+    new = pd.DataFrame({"id": [5], "department": [math.nan], "category": ["Travel"],
+                        "employee": ["Bo"], "vendor": ["Delta"], "amount": [120.0]})
+    results = detector.observe_frame(new)
+    assert results[0]["department"] == UNKNOWN
+    assert detector.segments[(UNKNOWN, "Travel")].transactions.count == 2
+
+    path = tmp_path / "state.json"
+    detector.save(path)
+    restored = OnlineOutlierDetector.load(path)
+    assert set(restored.segments) == set(detector.segments)
+    assert ("Sales|East", "Meals") in restored.segments
+    assert restored.last_id == 5